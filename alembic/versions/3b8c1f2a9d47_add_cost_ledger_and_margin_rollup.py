@@ -0,0 +1,107 @@
+"""add_cost_ledger_and_margin_rollup
+
+Revision ID: 3b8c1f2a9d47
+Revises: e7f590dfeeed
+Create Date: 2026-10-19 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8c1f2a9d47'
+down_revision: Union[str, Sequence[str], None] = 'e7f590dfeeed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Учётная себестоимость товара
+    op.create_table(
+        'ProductCost',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('productId', sa.String(), nullable=False),
+        sa.Column('stockCount', sa.Integer(), nullable=False),
+        sa.Column('avgCost', sa.Float(), nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['productId'], ['Product.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('productId')
+    )
+
+    # 2. Дневные агрегаты маржи
+    op.create_table(
+        'SaleMarginRollup',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('productId', sa.String(), nullable=False),
+        sa.Column('categoryId', sa.String(), nullable=False),
+        sa.Column('employeeId', sa.String(), nullable=False),
+        sa.Column('unitsSold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('cost', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['productId'], ['Product.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['categoryId'], ['ProductCategory.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['employeeId'], ['Employee.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('day', 'productId', 'employeeId', name='uq_SaleMarginRollup_day_product_employee')
+    )
+    op.create_index('ix_SaleMarginRollup_day', 'SaleMarginRollup', ['day'])
+
+    # 3. Заполняем себестоимость по истории закупок: средняя по всем поступлениям,
+    #    учётный остаток берём из текущих остатков склада
+    op.execute("""
+        INSERT INTO "ProductCost" (id, "productId", "stockCount", "avgCost", "updatedAt")
+        SELECT gen_random_uuid()::text,
+               p.id,
+               COALESCE(sr."restCount", 0),
+               COALESCE(o.amount / NULLIF(o.units, 0), 0),
+               NOW()
+        FROM "Product" p
+        LEFT JOIN "ShopRest" sr ON sr."productId" = p.id
+        LEFT JOIN (
+            SELECT "ProductId", SUM(count * "purchasePrice") AS amount, SUM(count) AS units
+            FROM "OrderToSupplier"
+            GROUP BY "ProductId"
+        ) o ON o."ProductId" = p.id
+    """)
+
+    # 4. Заполняем агрегаты по прошлым продажам. Выручка продажи распределяется
+    #    по строкам пропорционально текущей цене товара
+    op.execute("""
+        INSERT INTO "SaleMarginRollup"
+            (id, day, "productId", "categoryId", "employeeId", "unitsSold", revenue, cost)
+        SELECT gen_random_uuid()::text, day, "productId", "categoryId", "employeeId",
+               SUM(count), SUM(revenue), SUM(cost)
+        FROM (
+            SELECT s."createdAt"::date AS day,
+                   p.id AS "productId",
+                   p."categoryId",
+                   s."employeeId",
+                   pts.count,
+                   COALESCE(
+                       s."finalPrice" * (p.price * pts.count)
+                       / NULLIF(SUM(p.price * pts.count) OVER (PARTITION BY s.id), 0),
+                       0
+                   ) AS revenue,
+                   pts.count * COALESCE(pc."avgCost", 0) AS cost
+            FROM "ProductToSale" pts
+            JOIN "Sale" s ON s.id = pts."saleId"
+            JOIN "Product" p ON p.id = pts."ProductId"
+            LEFT JOIN "ProductCost" pc ON pc."productId" = p.id
+        ) lines
+        GROUP BY day, "productId", "categoryId", "employeeId"
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_SaleMarginRollup_day', table_name='SaleMarginRollup')
+    op.drop_table('SaleMarginRollup')
+    op.drop_table('ProductCost')
@@ -0,0 +1,55 @@
+"""add_supplier_monthly_rollup
+
+Revision ID: 5d9e3a7c1b48
+Revises: c41f7a9e2b65
+Create Date: 2026-10-19 16:41:08.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e3a7c1b48'
+down_revision: Union[str, Sequence[str], None] = 'c41f7a9e2b65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Месячные агрегаты закупок у поставщиков
+    op.create_table(
+        'SupplierMonthlyRollup',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('supplierId', sa.String(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('ordersCount', sa.Integer(), nullable=False),
+        sa.Column('linesCount', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('spend', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['supplierId'], ['Supplier.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('supplierId', 'month', name='uq_SupplierMonthlyRollup_supplier_month')
+    )
+    op.create_index('ix_SupplierMonthlyRollup_month', 'SupplierMonthlyRollup', ['month'])
+
+    # 2. Заполняем агрегаты по истории заказов (месяц - по дате шапки заказа)
+    op.execute("""
+        INSERT INTO "SupplierMonthlyRollup" (id, "supplierId", month, "ordersCount", "linesCount", units, spend)
+        SELECT gen_random_uuid()::text, po."supplierId", date_trunc('month', po."createdAt")::date,
+               COUNT(DISTINCT po.id), COUNT(o.id), COALESCE(SUM(o.count), 0),
+               COALESCE(SUM(o.count * o."purchasePrice"), 0)
+        FROM "PurchaseOrder" po
+        JOIN "OrderToSupplier" o ON o."purchaseOrderId" = po.id
+        GROUP BY po."supplierId", date_trunc('month', po."createdAt")
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_SupplierMonthlyRollup_month', table_name='SupplierMonthlyRollup')
+    op.drop_table('SupplierMonthlyRollup')
@@ -0,0 +1,46 @@
+"""add_supplier_order_search_indexes
+
+Revision ID: 8e2d4c6a1f93
+Revises: 3b8c1f2a9d47
+Create Date: 2026-10-19 13:40:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d4c6a1f93'
+down_revision: Union[str, Sequence[str], None] = '3b8c1f2a9d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс под группировку и сортировку заказов по минуте и поставщику
+    op.execute("""
+        CREATE INDEX "ix_OrderToSupplier_minute_supplier"
+        ON "OrderToSupplier" (date_trunc('minute', "createdAt") DESC, "supplierId" DESC)
+    """)
+    op.create_index('ix_OrderToSupplier_ProductId', 'OrderToSupplier', ['ProductId'])
+
+    # Триграммные индексы для поиска ILIKE '%...%' по поставщику и товару
+    bind = op.get_bind()
+    has_trgm = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).scalar()
+    if has_trgm:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX "ix_Supplier_name_trgm" ON "Supplier" USING gin (name gin_trgm_ops)')
+        op.execute('CREATE INDEX "ix_Product_name_trgm" ON "Product" USING gin (name gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS "ix_Product_name_trgm"')
+    op.execute('DROP INDEX IF EXISTS "ix_Supplier_name_trgm"')
+    op.drop_index('ix_OrderToSupplier_ProductId', table_name='OrderToSupplier')
+    op.execute('DROP INDEX IF EXISTS "ix_OrderToSupplier_minute_supplier"')
@@ -0,0 +1,32 @@
+"""add_employee_token_version
+
+Revision ID: 9b4e2d7c1a53
+Revises: f83b1d5a9c27
+Create Date: 2026-10-19 19:12:44.208517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e2d7c1a53'
+down_revision: Union[str, Sequence[str], None] = 'f83b1d5a9c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Версия токенов сотрудника: выпущенные ранее токены содержат 0 и остаются действительными
+    op.add_column(
+        'Employee',
+        sa.Column('tokenVersion', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('Employee', 'tokenVersion')
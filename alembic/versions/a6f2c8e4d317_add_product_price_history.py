@@ -0,0 +1,77 @@
+"""add_product_price_history
+
+Revision ID: a6f2c8e4d317
+Revises: 5d9e3a7c1b48
+Create Date: 2026-10-19 17:23:51.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f2c8e4d317'
+down_revision: Union[str, Sequence[str], None] = '5d9e3a7c1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Таблица истории цен
+    op.create_table(
+        'ProductPriceHistory',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('productId', sa.String(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('validFrom', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['productId'], ['Product.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index(
+        'ix_ProductPriceHistory_productId_validFrom',
+        'ProductPriceHistory',
+        ['productId', 'validFrom']
+    )
+
+    # 2. История из закупок: цена менялась при каждой поставке,
+    #    повторы той же цены подряд схлопываем
+    op.execute("""
+        INSERT INTO "ProductPriceHistory" (id, "productId", price, "validFrom")
+        SELECT gen_random_uuid()::text, product_id, price, created_at
+        FROM (
+            SELECT product_id, price, created_at,
+                   LAG(price) OVER (PARTITION BY product_id ORDER BY created_at) AS prev_price
+            FROM (
+                -- Товар, повторённый в одном заказе, учитываем одной ценой
+                SELECT DISTINCT ON ("ProductId", "createdAt")
+                       "ProductId" AS product_id, "purchasePrice" AS price, "createdAt" AS created_at
+                FROM "OrderToSupplier"
+                ORDER BY "ProductId", "createdAt"
+            ) purchases
+        ) changes
+        WHERE prev_price IS DISTINCT FROM price
+    """)
+
+    # 3. Текущая цена, если она изменена вручную или закупок не было
+    op.execute("""
+        INSERT INTO "ProductPriceHistory" (id, "productId", price, "validFrom")
+        SELECT gen_random_uuid()::text, p.id, p.price, now() AT TIME ZONE 'utc'
+        FROM "Product" p
+        LEFT JOIN LATERAL (
+            SELECT h.price FROM "ProductPriceHistory" h
+            WHERE h."productId" = p.id
+            ORDER BY h."validFrom" DESC
+            LIMIT 1
+        ) last ON true
+        WHERE last.price IS DISTINCT FROM p.price
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ProductPriceHistory_productId_validFrom', table_name='ProductPriceHistory')
+    op.drop_table('ProductPriceHistory')
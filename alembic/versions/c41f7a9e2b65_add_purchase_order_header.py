@@ -0,0 +1,82 @@
+"""add_purchase_order_header
+
+Revision ID: c41f7a9e2b65
+Revises: 8e2d4c6a1f93
+Create Date: 2026-10-19 15:02:37.114590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e2b65'
+down_revision: Union[str, Sequence[str], None] = '8e2d4c6a1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Таблица шапок заказов
+    op.create_table(
+        'PurchaseOrder',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('supplierId', sa.String(), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), nullable=False),
+        sa.Column('totalCount', sa.Integer(), nullable=False),
+        sa.Column('totalAmount', sa.Float(), nullable=False),
+        sa.Column('linesCount', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['supplierId'], ['Supplier.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index('ix_PurchaseOrder_createdAt_id', 'PurchaseOrder', ['createdAt', 'id'])
+    op.create_index('ix_PurchaseOrder_supplierId_createdAt', 'PurchaseOrder', ['supplierId', 'createdAt'])
+
+    # 2. Создаём шапки для существующих строк по прежнему правилу группировки:
+    #    поставщик + минута создания
+    op.execute("""
+        INSERT INTO "PurchaseOrder" (id, "supplierId", "createdAt", "totalCount", "totalAmount", "linesCount")
+        SELECT gen_random_uuid()::text, "supplierId", MIN("createdAt"),
+               SUM(count), SUM(count * "purchasePrice"), COUNT(*)
+        FROM "OrderToSupplier"
+        GROUP BY "supplierId", date_trunc('minute', "createdAt")
+    """)
+
+    # 3. Привязываем строки к шапкам
+    op.add_column('OrderToSupplier', sa.Column('purchaseOrderId', sa.String(), nullable=True))
+    op.execute("""
+        UPDATE "OrderToSupplier" o
+        SET "purchaseOrderId" = po.id
+        FROM "PurchaseOrder" po
+        WHERE po."supplierId" = o."supplierId"
+          AND date_trunc('minute', po."createdAt") = date_trunc('minute', o."createdAt")
+    """)
+    op.alter_column('OrderToSupplier', 'purchaseOrderId', nullable=False)
+    op.create_foreign_key(
+        'fk_ordertosupplier_purchaseorder',
+        'OrderToSupplier', 'PurchaseOrder',
+        ['purchaseOrderId'], ['id'],
+        ondelete='CASCADE'
+    )
+    op.create_index('ix_OrderToSupplier_purchaseOrderId', 'OrderToSupplier', ['purchaseOrderId'])
+
+    # 4. Группировка по минуте больше не нужна
+    op.execute('DROP INDEX IF EXISTS "ix_OrderToSupplier_minute_supplier"')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        CREATE INDEX "ix_OrderToSupplier_minute_supplier"
+        ON "OrderToSupplier" (date_trunc('minute', "createdAt") DESC, "supplierId" DESC)
+    """)
+    op.drop_index('ix_OrderToSupplier_purchaseOrderId', table_name='OrderToSupplier')
+    op.drop_constraint('fk_ordertosupplier_purchaseorder', 'OrderToSupplier', type_='foreignkey')
+    op.drop_column('OrderToSupplier', 'purchaseOrderId')
+    op.drop_index('ix_PurchaseOrder_supplierId_createdAt', table_name='PurchaseOrder')
+    op.drop_index('ix_PurchaseOrder_createdAt_id', table_name='PurchaseOrder')
+    op.drop_table('PurchaseOrder')
@@ -0,0 +1,31 @@
+"""add_discount_schedule
+
+Revision ID: f83b1d5a9c27
+Revises: a6f2c8e4d317
+Create Date: 2026-10-19 18:05:12.640291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f83b1d5a9c27'
+down_revision: Union[str, Sequence[str], None] = 'a6f2c8e4d317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Период действия скидки, существующие скидки остаются бессрочными
+    op.add_column('Discount', sa.Column('startsAt', sa.DateTime(), nullable=True))
+    op.add_column('Discount', sa.Column('endsAt', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('Discount', 'endsAt')
+    op.drop_column('Discount', 'startsAt')
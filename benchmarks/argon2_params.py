@@ -0,0 +1,71 @@
+"""Measure Argon2 hash time across memory/time cost settings on this host
+
+Запуск на машине, где будет работать сервер:
+
+    python -m benchmarks.argon2_params --target-ms 250
+    python -m benchmarks.argon2_params --memory 19456 65536 131072 --time 1 2 3 4 --samples 5
+
+Печатает медианное время хэширования для каждой пары параметров и
+рекомендует самую дорогую для перебора конфигурацию, укладывающуюся
+в целевое время. Найденные значения задаются через AUTH_ARGON2_*;
+хэши сотрудников пересчитаются при их следующем входе.
+"""
+import argparse
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from passlib.hash import argon2
+
+from src.config import settings
+
+DEFAULT_MEMORY_COSTS = [19456, 32768, 47104, 65536, 102400, 131072]
+DEFAULT_TIME_COSTS = [1, 2, 3, 4]
+
+
+def measure(memory_cost: int, time_cost: int, parallelism: int, samples: int) -> float:
+    """Медианное время одного хэша в миллисекундах"""
+    hasher = argon2.using(memory_cost=memory_cost, rounds=time_cost, parallelism=parallelism)
+    hasher.hash("warm-up")
+    timings = []
+    for i in range(samples):
+        started = time.perf_counter()
+        hasher.hash(f"benchmark-password-{i}")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(memory_costs: List[int], time_costs: List[int], parallelism: int, samples: int, target_ms: float):
+    print(f"parallelism={parallelism}, samples={samples}, target={target_ms:.0f}ms")
+    print(f"{'memory KiB':>11} {'time':>5} {'median ms':>10}")
+
+    best: Optional[Tuple[int, int, float]] = None
+    for memory_cost in memory_costs:
+        for time_cost in time_costs:
+            median = measure(memory_cost, time_cost, parallelism, samples)
+            mark = ""
+            if median <= target_ms:
+                mark = "  ok"
+                # Стойкость к перебору растёт с произведением памяти на число проходов
+                if best is None or memory_cost * time_cost > best[0] * best[1]:
+                    best = (memory_cost, time_cost, median)
+            print(f"{memory_cost:>11} {time_cost:>5} {median:>10.1f}{mark}")
+
+    current = (settings.AUTH_ARGON2_MEMORY_COST, settings.AUTH_ARGON2_TIME_COST)
+    print(f"\nтекущие параметры: memory={current[0]} time={current[1]}")
+    if best is None:
+        print("ни одна конфигурация не укладывается в целевое время")
+        return
+    print(f"рекомендация: AUTH_ARGON2_MEMORY_COST={best[0]} AUTH_ARGON2_TIME_COST={best[1]} "
+          f"AUTH_ARGON2_PARALLELISM={parallelism} ({best[2]:.1f}ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Подбор параметров argon2 под целевое время хэширования")
+    parser.add_argument("--memory", type=int, nargs="+", default=DEFAULT_MEMORY_COSTS, help="memory_cost, КиБ")
+    parser.add_argument("--time", type=int, nargs="+", default=DEFAULT_TIME_COSTS, help="time_cost (проходы)")
+    parser.add_argument("--parallelism", type=int, default=settings.AUTH_ARGON2_PARALLELISM)
+    parser.add_argument("--samples", type=int, default=5, help="Хэшей на конфигурацию")
+    parser.add_argument("--target-ms", type=float, default=settings.AUTH_ARGON2_TARGET_MS, help="Целевое время хэша, мс")
+    args = parser.parse_args()
+    run(args.memory, args.time, args.parallelism, args.samples, args.target_ms)
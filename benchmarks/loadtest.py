@@ -0,0 +1,292 @@
+"""End-to-end load benchmark: throughput and latency of the main API scenarios
+
+Запуск против работающего сервера с локальным Postgres (нужен httpx):
+
+    AUTH_SECRET_KEY=bench-secret WEB_CONCURRENCY=2 uvicorn src.main:app --port 8008
+    python -m benchmarks.loadtest --base-url http://localhost:8008 --duration 20 --concurrency 20
+
+или в одном процессе с приложением (без сети, удобно для сравнения коммитов):
+
+    python -m benchmarks.loadtest --in-process --scenarios search checkout
+
+Сценарии: search (поиск каталога), checkout (POST /products/sale),
+receiving (POST /suppliers/orders), discounts (GET /discounts/),
+reports (отчеты по очереди). Каждый сценарий выполняется отдельно
+фиксированным числом параллельных клиентов в течение --duration секунд
+после прогрева. Перед замером создаются (один раз) тестовые товары
+bench-* и им поставляется запас для продаж.
+
+Результаты сохраняются в benchmarks/results/<commit>.json (с суффиксом
+-dirty при незакоммиченных изменениях) и сравниваются с результатами
+ближайшего предыдущего коммита, для которого они есть.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.login_storm import ensure_employee, percentile
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PRODUCT_PREFIX = "bench-"
+SUPPLIER_NAME = "Бенчмарк поставщик"
+SEARCH_TERMS = [None, "bench", "bench-1", "bench-2", "nothing-matches"]
+REPORT_PATHS = [
+    ("/reports/", {}),
+    ("/reports/margin", {"group_by": "category"}),
+    ("/reports/inventory", {"limit": 50}),
+    ("/reports/suppliers", {"limit": 10})
+]
+
+
+class Fixture:
+    """Данные, созданные для сценариев"""
+
+    def __init__(self, token: str, product_ids: List[str], supplier_id: str):
+        self.token = token
+        self.product_ids = product_ids
+        self.supplier_id = supplier_id
+
+
+async def prepare(client: httpx.AsyncClient, args) -> Fixture:
+    """Сотрудник, товары bench-*, поставщик и запас на складе"""
+    await ensure_employee(client, args.email, args.password)
+    response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+    response.raise_for_status()
+    token = response.json()["accessToken"]
+
+    response = await client.get("/products/search", params={"search": PRODUCT_PREFIX, "limit": 1000})
+    response.raise_for_status()
+    product_ids = [product["id"] for product in response.json() if product["name"].startswith(PRODUCT_PREFIX)]
+
+    missing = args.products - len(product_ids)
+    if missing > 0:
+        tag = random.randint(0, 10 ** 9)
+        size = await client.post("/products/sizes", json={"value": tag % 1000 + 1000})
+        color = await client.post("/products/colors", json={"name": f"bench-color-{tag}"})
+        category = await client.post("/products/categories", json={"name": f"bench-category-{tag}"})
+        for response in (size, color, category):
+            response.raise_for_status()
+        seasons = ["FALL", "WINTER", "SPRING", "SUMMER"]
+        for i in range(len(product_ids), args.products):
+            response = await client.post("/products/", json={
+                "name": f"{PRODUCT_PREFIX}{i}",
+                "sizeId": size.json()["id"],
+                "season": seasons[i % len(seasons)],
+                "colorId": color.json()["id"],
+                "categoryId": category.json()["id"]
+            })
+            response.raise_for_status()
+            product_ids.append(response.json()["id"])
+    product_ids = product_ids[:args.products]
+
+    response = await client.get("/suppliers/")
+    response.raise_for_status()
+    supplier_id = next((s["id"] for s in response.json() if s["name"] == SUPPLIER_NAME), None)
+    if supplier_id is None:
+        response = await client.post("/suppliers/", json={"name": SUPPLIER_NAME, "contacts": "bench@example.com"})
+        response.raise_for_status()
+        supplier_id = response.json()["id"]
+
+    # Запас, чтобы продажи во время замера не упирались в нулевые остатки
+    response = await client.post("/suppliers/orders", json={
+        "supplierId": supplier_id,
+        "products": [
+            {"productId": product_id, "count": args.stock, "purchasePrice": round(random.uniform(5, 50), 2)}
+            for product_id in product_ids
+        ]
+    })
+    response.raise_for_status()
+    return Fixture(token, product_ids, supplier_id)
+
+
+def build_scenarios(fixture: Fixture) -> Dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]]:
+    auth = {"Authorization": f"Bearer {fixture.token}"}
+
+    async def search(client):
+        params = {"limit": 20, "offset": random.choice([0, 0, 20, 40])}
+        term = random.choice(SEARCH_TERMS)
+        if term:
+            params["search"] = term
+        return await client.get("/products/search", params=params)
+
+    async def checkout(client):
+        items = [
+            {"productId": product_id, "count": 1}
+            for product_id in random.sample(fixture.product_ids, k=min(3, len(fixture.product_ids)))
+        ]
+        return await client.post("/products/sale", json={"items": items}, headers=auth)
+
+    async def receiving(client):
+        lines = [
+            {"productId": product_id, "count": random.randint(1, 20), "purchasePrice": round(random.uniform(5, 50), 2)}
+            for product_id in random.sample(fixture.product_ids, k=min(5, len(fixture.product_ids)))
+        ]
+        return await client.post("/suppliers/orders", json={"supplierId": fixture.supplier_id, "products": lines})
+
+    async def discounts(client):
+        return await client.get("/discounts/")
+
+    async def reports(client):
+        path, params = random.choice(REPORT_PATHS)
+        return await client.get(path, params=params)
+
+    return {
+        "search": search,
+        "checkout": checkout,
+        "receiving": receiving,
+        "discounts": discounts,
+        "reports": reports
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario, concurrency: int, warmup: float, duration: float) -> dict:
+    """Замкнутый цикл: concurrency клиентов отправляют запросы один за другим"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    measuring = False
+
+    async def worker(deadline: float):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client)
+                error = None if response.status_code < 400 else str(response.status_code)
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            if not measuring:
+                continue
+            if error is None:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[error] = errors.get(error, 0) + 1
+
+    if warmup > 0:
+        await asyncio.gather(*(worker(time.perf_counter() + warmup) for _ in range(concurrency)))
+
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+        "maxMs": round(max(latencies, default=0) * 1000, 2),
+        "meanMs": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+
+def git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def current_revision() -> str:
+    commit = git("rev-parse", "--short=12", "HEAD") or "unknown"
+    return f"{commit}-dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def find_baseline(revision: str, explicit: Optional[str]) -> Optional[Path]:
+    """Файл результатов для сравнения: указанный коммит или ближайший предыдущий с результатами"""
+    if explicit:
+        commit = git("rev-parse", "--short=12", explicit) or explicit
+        path = RESULTS_DIR / f"{commit}.json"
+        return path if path.exists() else None
+    for commit in (git("rev-list", "--max-count=200", "HEAD") or "").split():
+        path = RESULTS_DIR / f"{commit[:12]}.json"
+        if commit[:12] != revision and path.exists():
+            return path
+    return None
+
+
+def print_results(results: Dict[str, dict], baseline: Optional[dict]) -> None:
+    print(f"{'scenario':<10} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['rps']:>8.1f} {result['p50Ms']:>9.2f} {result['p95Ms']:>9.2f} "
+            f"{result['p99Ms']:>9.2f} {result['maxMs']:>9.2f} {sum(result['errors'].values()):>7}"
+        )
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous:
+            def delta(key):
+                return (result[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+            print(f"{'':<10} {delta('rps'):>+7.1f}% {delta('p50Ms'):>+8.1f}% {delta('p95Ms'):>+8.1f}% "
+                  f"{delta('p99Ms'):>+8.1f}%")
+
+
+async def run(args):
+    if args.in_process:
+        from src.main import app
+        # Исключения приложения - ответы 500, как у сервера, а не падение замера
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency + 10)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits)
+
+    async with client:
+        fixture = await prepare(client, args)
+        scenarios = build_scenarios(fixture)
+        results = {}
+        for name in args.scenarios:
+            print(f"{name}: прогрев {args.warmup:.0f}с, замер {args.duration:.0f}с, клиентов {args.concurrency}")
+            results[name] = await run_scenario(client, scenarios[name], args.concurrency, args.warmup, args.duration)
+
+    revision = current_revision()
+    baseline_path = find_baseline(revision, args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path else None
+
+    if baseline_path:
+        print(f"\nсравнение с {baseline_path.stem} (изменение в %)")
+    print_results(results, baseline)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{revision}.json"
+        path.write_text(json.dumps({
+            "revision": revision,
+            "subject": git("log", "-1", "--format=%s"),
+            "recordedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": "in-process" if args.in_process else args.base_url,
+            "params": {
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "products": args.products
+            },
+            "results": results
+        }, ensure_ascii=False, indent=2))
+        print(f"\nрезультаты сохранены: {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест основных сценариев API")
+    parser.add_argument("--base-url", default="http://localhost:8008")
+    parser.add_argument("--in-process", action="store_true", help="Запустить src.main:app в этом процессе")
+    parser.add_argument("--scenarios", nargs="+", default=["search", "checkout", "receiving", "discounts", "reports"],
+                        choices=["search", "checkout", "receiving", "discounts", "reports"])
+    parser.add_argument("--concurrency", type=int, default=20, help="Параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность замера сценария, с")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Прогрев перед замером, с")
+    parser.add_argument("--products", type=int, default=50, help="Тестовых товаров bench-*")
+    parser.add_argument("--stock", type=int, default=1000, help="Поставка на товар перед замером")
+    parser.add_argument("--email", default="bench-load@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--baseline", default=None, help="Коммит для сравнения (по умолчанию ближайший с результатами)")
+    parser.add_argument("--no-save", action="store_true", help="Не сохранять результаты")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,177 @@
+"""Login storm benchmark: latency of /products/search while many employees log in
+
+Запуск против работающего сервера (нужен httpx: pip install httpx):
+
+    AUTH_SECRET_KEY=bench-secret AUTH_LOGIN_RATE_LIMIT_ENABLED=false uvicorn src.main:app --port 8008
+    python -m benchmarks.login_storm --base-url http://localhost:8008 --logins 200 --concurrency 50
+
+Создаёт тестовых сотрудников (если их нет), затем параллельно выполняет
+волну логинов и фоновые запросы поиска товаров. Если хэширование
+блокирует цикл событий, задержки поиска растут вместе с числом логинов.
+
+Логины распределяются по --employees сотрудникам по кругу, чтобы не упираться
+в лимит попыток на email. Все запросы идут с одного IP, поэтому лимит по IP
+(AUTH_LOGIN_IP_BURST) для замера нужно отключить на сервере через
+AUTH_LOGIN_RATE_LIMIT_ENABLED=false. Отклонённые (429) логины не прерывают
+замер, а выводятся отдельно.
+
+Результат на 1 CPU (uvicorn, 1 воркер, argon2 по умолчанию, 200 логинов,
+50 одновременно, 40 сотрудников, AUTH_LOGIN_RATE_LIMIT_ENABLED=false).
+
+До: 4 потока argon2, логин держит соединение пула, пока ждет очереди хэшей:
+
+    search (без нагрузки):     n=93 p50=11.4ms p95=14.7ms max=54.7ms
+    search (во время логинов): n=17 p50=296.6ms p95=8239.6ms max=8526.0ms
+    login:                     n=200 p50=11010.2ms p95=11652.6ms max=12417.0ms
+    логинов в секунду: 4.4
+
+После: соединение освобождается до хэширования, потоков argon2 - CPU минус один (1):
+
+    search (без нагрузки):     n=87 p50=13.3ms p95=17.5ms max=76.9ms
+    search (во время логинов): n=584 p50=63.2ms p95=96.3ms max=869.4ms
+    login:                     n=200 p50=13743.5ms p95=14509.3ms max=14641.3ms
+    логинов в секунду: 3.8
+
+(Только освобождение соединения, 4 потока: search во время логинов p95=450.7ms.)
+
+С включённым лимитом тот же запуск получает 161 ответ 429 из 200.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(title: str, latencies: List[float]) -> None:
+    if not latencies:
+        print(f"{title}: нет запросов")
+        return
+    print(
+        f"{title}: n={len(latencies)} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+        f"max={max(latencies) * 1000:.1f}ms "
+        f"mean={statistics.mean(latencies) * 1000:.1f}ms"
+    )
+
+
+async def ensure_employee(client: httpx.AsyncClient, email: str, password: str) -> None:
+    response = await client.post("/auth/create-employee", json={
+        "role": "SELLER",
+        "name": "Бенчмарк",
+        "lastname": "Логин",
+        "email": email,
+        "password": password
+    })
+    if response.status_code not in (201, 409):
+        response.raise_for_status()
+
+
+async def search_probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float, latencies: List[float]):
+    """Фоновый поиск товаров с фиксированным интервалом"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/products/search", params={"limit": 20})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+def employee_email(email: str, index: int) -> str:
+    """bench-login@example.com -> bench-login-3@example.com"""
+    name, _, domain = email.partition("@")
+    return f"{name}-{index}@{domain}"
+
+
+async def login_storm(client: httpx.AsyncClient, emails: List[str], password: str, logins: int, concurrency: int,
+                      latencies: List[float]) -> Tuple[int, int]:
+    """
+    Выполнить логины по кругу по сотрудникам
+
+    Ответ 503 (очередь хэшей заполнена) повторяется после Retry-After, как это
+    сделал бы клиент; задержка логина включает повторы.
+    Возвращает (отклонено лимитом попыток (429), ответов 503).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+    busy = 0
+
+    async def login(i: int):
+        nonlocal rejected, busy
+        async with semaphore:
+            started = time.perf_counter()
+            while True:
+                response = await client.post("/auth/login", json={"email": emails[i % len(emails)], "password": password})
+                if response.status_code != 503:
+                    break
+                busy += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            if response.status_code == 429:
+                rejected += 1
+                return
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    return rejected, busy
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        emails = [employee_email(args.email, i) for i in range(args.employees)]
+        for email in emails:
+            await ensure_employee(client, email, args.password)
+
+        # Базовая задержка поиска без нагрузки
+        baseline: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(search_probe(client, stop, args.probe_interval, baseline))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await probe
+
+        # Поиск во время волны логинов
+        during: List[float] = []
+        login_latencies: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(search_probe(client, stop, args.probe_interval, during))
+        started = time.perf_counter()
+        rejected, busy = await login_storm(client, emails, args.password, args.logins, args.concurrency, login_latencies)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    report("search (без нагрузки)", baseline)
+    report("search (во время логинов)", during)
+    report("login", login_latencies)
+    print(f"логинов в секунду: {len(login_latencies) / elapsed:.1f}")
+    if busy:
+        print(f"ответов 503 (очередь хэшей заполнена, повторены): {busy}")
+    if rejected:
+        print(f"отклонено лимитом попыток (429): {rejected} - запустите сервер с AUTH_LOGIN_RATE_LIMIT_ENABLED=false")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Задержка поиска товаров во время волны логинов")
+    parser.add_argument("--base-url", default="http://localhost:8008")
+    parser.add_argument("--email", default="bench-login@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--logins", type=int, default=200, help="Всего логинов")
+    parser.add_argument("--employees", type=int, default=40, help="Сотрудников, по которым распределяются логины")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных логинов")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="Пауза между запросами поиска, с")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0, help="Длительность замера без нагрузки, с")
+    asyncio.run(run(parser.parse_args()))
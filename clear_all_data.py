@@ -4,12 +4,17 @@ from sqlalchemy import delete
 from src.database import async_session_maker
 from src.models import (
     ProductToSale,
+    SaleMarginRollup,
+    ProductCost,
+    ProductPriceHistory,
     ProductToDiscount,
     CategoryToDiscount,
     ColorToDiscount,
     SeasonToDiscount,
     SizeToDiscount,
     OrderToSupplier,
+    SupplierMonthlyRollup,
+    PurchaseOrder,
     ShopRest,
     Sale,
     Product,
@@ -31,12 +36,17 @@ async def clear_all_data():
             # Удаляем сначала связующие таблицы (many-to-many и детали)
             tables_to_clear = [
                 ("ProductToSale", ProductToSale),
+                ("SaleMarginRollup", SaleMarginRollup),
+                ("ProductCost", ProductCost),
+                ("ProductPriceHistory", ProductPriceHistory),
                 ("ProductToDiscount", ProductToDiscount),
                 ("CategoryToDiscount", CategoryToDiscount),
                 ("ColorToDiscount", ColorToDiscount),
                 ("SeasonToDiscount", SeasonToDiscount),
                 ("SizeToDiscount", SizeToDiscount),
                 ("OrderToSupplier", OrderToSupplier),
+                ("SupplierMonthlyRollup", SupplierMonthlyRollup),
+                ("PurchaseOrder", PurchaseOrder),
                 ("ShopRest", ShopRest),
                 ("Sale", Sale),
                 ("Product", Product),
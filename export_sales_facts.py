@@ -0,0 +1,103 @@
+"""Export sales facts into a columnar snapshot for offline analytics"""
+import argparse
+import asyncio
+from datetime import timedelta, timezone
+
+from sqlalchemy import select, func, literal
+
+from src.config import settings
+from src.database import async_session_maker
+from src.models import Sale, ProductToSale, Product, ProductCategory, Employee
+from src.product.prices import PriceHistoryService
+from src.reports.columnar import SalesFactWriter, FACT_COLUMNS
+
+# Окно перед водяным знаком, которое перечитывается при каждой выгрузке:
+# транзакция продажи может закоммититься позже продаж с более поздним createdAt.
+# Уже выгруженные продажи окна пропускаются по ID, поэтому повтор не дублирует
+# строки. Продажа, закоммиченная позже чем через EXPORT_OVERLAP после своего
+# createdAt, в снимок не попадет - окно должно быть заведомо больше самой
+# долгой транзакции продажи.
+EXPORT_OVERLAP = timedelta(minutes=10)
+PART_ROWS = 1_000_000
+
+
+def _write_part(writer: SalesFactWriter, rows) -> int:
+    """Закодировать строки выборки и записать их отдельной частью"""
+    columns = {column: [] for column in FACT_COLUMNS}
+    sales = {}
+    for sale_id, created_at, product_id, product_name, employee_id, employee_name, \
+            category_id, category_name, count, line_revenue in rows:
+        sales[sale_id] = created_at
+        columns["sale_ts"].append(int(created_at.replace(tzinfo=timezone.utc).timestamp()))
+        columns["product"].append(writer.encode("product", product_id, product_name))
+        columns["employee"].append(writer.encode("employee", employee_id, employee_name))
+        columns["category"].append(writer.encode("category", category_id, category_name))
+        columns["units"].append(count)
+        columns["revenue"].append(float(line_revenue))
+    return writer.append_part(columns, sales)
+
+
+async def export_sales_facts(root: str):
+    writer = SalesFactWriter(root, overlap=EXPORT_OVERLAP)
+    since = writer.export_since
+    exported = writer.recent_sale_ids
+
+    # Выручка позиции - доля итоговой суммы чека пропорционально цене товара
+    # на момент продажи (по истории цен; без истории - текущая цена)
+    price_at = PriceHistoryService.price_at_lateral(ProductToSale.ProductId, Sale.createdAt)
+    line_value = func.coalesce(price_at.c.price, Product.price) * ProductToSale.count
+    revenue = func.coalesce(
+        Sale.finalPrice * line_value / func.nullif(func.sum(line_value).over(partition_by=Sale.id), 0),
+        0
+    )
+    stmt = (
+        select(
+            Sale.id,
+            Sale.createdAt,
+            Product.id, Product.name,
+            Employee.id, func.concat_ws(' ', Employee.lastname, Employee.name, Employee.patronymic),
+            ProductCategory.id, ProductCategory.name,
+            ProductToSale.count,
+            revenue
+        )
+        .join(ProductToSale, ProductToSale.saleId == Sale.id)
+        .join(Product, Product.id == ProductToSale.ProductId)
+        .outerjoin(price_at, literal(True))
+        .join(ProductCategory, ProductCategory.id == Product.categoryId)
+        .join(Employee, Employee.id == Sale.employeeId)
+        .order_by(Sale.createdAt, Sale.id)
+    )
+    if since:
+        stmt = stmt.where(Sale.createdAt > since)
+
+    total = 0
+    pending = []
+    async with async_session_maker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=PART_ROWS))
+        async for partition in result.partitions():
+            rows = pending + [row for row in partition if row[0] not in exported]
+            if not rows:
+                continue
+            # Строки последнего чека переносим в следующую часть, чтобы чек
+            # не разрезался между частями: в recentSales он попадает целиком
+            last_sale_id = rows[-1][0]
+            split = len(rows)
+            while split > 0 and rows[split - 1][0] == last_sale_id:
+                split -= 1
+            if split == 0:
+                pending = rows
+                continue
+            pending = rows[split:]
+            total += _write_part(writer, rows[:split])
+            print(f"  ✓ Выгружено строк: {total}")
+        if pending:
+            total += _write_part(writer, pending)
+
+    print(f"✅ Выгрузка завершена: новых строк {total}, всего {writer.manifest['rows']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Выгрузка фактов продаж в колоночный снимок")
+    parser.add_argument("--output", default=settings.SALES_FACTS_DIR, help="Каталог снимка")
+    args = parser.parse_args()
+    asyncio.run(export_sales_facts(args.output))
@@ -0,0 +1,35 @@
+"""Compute reorder suggestions for the whole catalog and save them as CSV"""
+import argparse
+import asyncio
+import csv
+import sys
+
+from src.database import async_session_maker
+from src.supplier.reorder import ReorderService
+from src.supplier.schemas import ReorderSuggestionResponse
+
+
+async def reorder_suggestions(output: str, window_days: int, coverage_days: int):
+    async with async_session_maker() as session:
+        suggestions = await ReorderService.compute_suggestions(session, window_days, coverage_days)
+
+    stream = open(output, "w", newline="", encoding="utf-8") if output != "-" else sys.stdout
+    try:
+        writer = csv.DictWriter(stream, fieldnames=list(ReorderSuggestionResponse.model_fields))
+        writer.writeheader()
+        for suggestion in suggestions:
+            writer.writerow(suggestion.model_dump())
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(f"✅ Товаров к дозаказу: {len(suggestions)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Рекомендации по дозаказу товаров")
+    parser.add_argument("--output", default="-", help="Файл CSV (по умолчанию stdout)")
+    parser.add_argument("--window-days", type=int, default=30, help="Окно расчета спроса, дней")
+    parser.add_argument("--coverage-days", type=int, default=14, help="На сколько дней спроса заказывать")
+    args = parser.parse_args()
+    asyncio.run(reorder_suggestions(args.output, args.window_days, args.coverage_days))
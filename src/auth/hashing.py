@@ -0,0 +1,70 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from src.config import settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+# Хэшей в пуле (выполняются и ждут в очереди); меняется только в цикле событий
+_pending = 0
+
+
+def hash_workers() -> int:
+    """Размер пула: AUTH_HASH_WORKERS или число CPU минус один (не меньше одного)"""
+    if settings.AUTH_HASH_WORKERS > 0:
+        return settings.AUTH_HASH_WORKERS
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """
+    Пул потоков для argon2
+
+    argon2-cffi отпускает GIL на время вычисления хэша, поэтому потоков
+    достаточно, чтобы не блокировать цикл событий. Но хэш занимает процессор
+    целиком: потоков больше, чем свободных CPU, отнимают время у цикла событий
+    и задерживают все остальные запросы, поэтому по умолчанию один CPU
+    остается циклу. Размер пула ограничивает и память: argon2 берёт
+    memory_cost на каждый хэш.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=hash_workers(),
+            thread_name_prefix="argon2"
+        )
+    return _executor
+
+
+async def run_in_hash_pool(func: Callable[..., T], *args) -> T:
+    """
+    Выполнить функцию хэширования в пуле, не блокируя цикл событий
+
+    Очередь пула ограничена AUTH_HASH_MAX_PENDING: при волне логинов лишние
+    запросы сразу получают 503 с Retry-After, а не ждут десятки секунд.
+    """
+    global _pending
+    if _pending >= settings.AUTH_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер занят проверкой паролей, повторите позже",
+            headers={"Retry-After": "1"}
+        )
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+def shutdown_hash_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
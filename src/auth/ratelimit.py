@@ -0,0 +1,179 @@
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+from src.config import settings
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class TokenBucketLimiter:
+    """
+    Ограничитель частоты по ключу (token bucket)
+
+    На ключ хранится [токены, время обновления], токены доливаются
+    со скоростью rate в секунду до capacity. Ключи упорядочены по последнему
+    обращению: простаивающие дольше полного восполнения удаляются (их корзина
+    и так полна), а сверх max_keys вытесняются самые давние.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.idle_seconds = capacity / rate if rate > 0 else math.inf
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _prune(self, now: float) -> None:
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            idle = now - updated >= self.idle_seconds
+            if not idle and len(self._buckets) <= self.max_keys:
+                break
+            if not idle:
+                self.evicted += 1
+            del self._buckets[key]
+
+    def peek(self, key: str, now: Optional[float] = None) -> float:
+        """Через сколько секунд будет доступен токен (0 - доступен сейчас)"""
+        now = now if now is not None else time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Списать токен
+
+        Returns:
+            0 - попытка разрешена, иначе через сколько секунд повторить
+        """
+        now = now if now is not None else time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.capacity, now]
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            retry_after = 0.0
+        else:
+            self.rejected += 1
+            retry_after = (1 - bucket[0]) / self.rate
+        self._prune(now)
+        return retry_after
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "keys": len(self._buckets),
+            "capacity": self.capacity,
+            "ratePerMinute": self.rate * 60
+        }
+
+
+class LoginRateLimiter:
+    """
+    Ограничение попыток входа по email и по IP
+
+    Проверяется до запроса к БД и до argon2. Токен списывается, только
+    если проходят оба ограничения, поэтому отклонённые по IP попытки
+    не расходуют лимит чужого email.
+    """
+
+    def __init__(self):
+        self.enabled = settings.AUTH_LOGIN_RATE_LIMIT_ENABLED
+        self.by_email = TokenBucketLimiter(
+            settings.AUTH_LOGIN_EMAIL_BURST,
+            settings.AUTH_LOGIN_EMAIL_PER_MINUTE / 60,
+            settings.AUTH_LOGIN_LIMITER_MAX_KEYS
+        )
+        self.by_ip = TokenBucketLimiter(
+            settings.AUTH_LOGIN_IP_BURST,
+            settings.AUTH_LOGIN_IP_PER_MINUTE / 60,
+            settings.AUTH_LOGIN_LIMITER_MAX_KEYS
+        )
+
+    def check(self, email: str, ip: str) -> Tuple[bool, float]:
+        """Вернуть (разрешено, через сколько секунд повторить)"""
+        if not self.enabled:
+            return True, 0.0
+        email = email.strip().lower()
+        now = time.monotonic()
+        ip_wait = self.by_ip.peek(ip, now)
+        email_wait = self.by_email.peek(email, now)
+        if ip_wait > 0 or email_wait > 0:
+            # Корзины не трогаем, отказ учитываем у ограничения, которое сработало
+            if ip_wait > 0:
+                self.by_ip.rejected += 1
+            else:
+                self.by_email.rejected += 1
+            return False, max(ip_wait, email_wait)
+        self.by_ip.acquire(ip, now)
+        self.by_email.acquire(email, now)
+        return True, 0.0
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "email": self.by_email.stats(), "ip": self.by_ip.stats()}
+
+
+def parse_networks(spec: str) -> List[Network]:
+    """'10.0.0.0/8, 127.0.0.1' -> список подсетей"""
+    return [
+        ipaddress.ip_network(part, strict=False)
+        for part in filter(None, (item.strip() for item in spec.split(",")))
+    ]
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_ip(
+    peer: Optional[str],
+    forwarded_for: Optional[str],
+    trusted: Optional[List[Network]] = None
+) -> str:
+    """
+    Адрес клиента для лимита по IP
+
+    Если соединение пришло от доверенного прокси, адрес берется из
+    X-Forwarded-For: справа налево пропускаются доверенные прокси, первый
+    недоверенный адрес - клиент. Левее него значения задает сам клиент,
+    поэтому они не используются.
+    """
+    trusted = _trusted_proxies if trusted is None else trusted
+    if not peer:
+        return "unknown"
+    if not forwarded_for or not _is_trusted(peer, trusted):
+        return peer
+    chain = [part.strip() for part in forwarded_for.split(",") if part.strip()]
+    for address in reversed(chain):
+        if not _is_trusted(address, trusted):
+            return address
+    return chain[0] if chain else peer
+
+
+_trusted_proxies = parse_networks(settings.AUTH_TRUSTED_PROXIES)
+
+login_limiter = LoginRateLimiter()
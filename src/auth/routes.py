@@ -1,4 +1,6 @@
-from fastapi import APIRouter, status, Depends
+import math
+
+from fastapi import APIRouter, HTTPException, Request, status, Depends
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -6,24 +8,65 @@ from src.auth.schemas import (
     LoginDto,
     CreateEmployeeDto,
     UpdateEmployeeDto,
-    EmployeeResponse
+    EmployeeResponse,
+    LoginResponse,
+    CurrentEmployeeResponse
 )
 from src.auth.service import AuthService
+from src.auth.tokens import token_service, get_current_employee, CurrentEmployee
+from src.auth.ratelimit import login_limiter, client_ip
 from src.database import get_db
 
 router = APIRouter()
 
 
-@router.post("/login", response_model=EmployeeResponse, status_code=status.HTTP_200_OK)
-async def login(login_dto: LoginDto, db: AsyncSession = Depends(get_db)):
+@router.post("/login", response_model=LoginResponse, status_code=status.HTTP_200_OK)
+async def login(login_dto: LoginDto, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Авторизация сотрудника
 
     - **email**: Email сотрудника
     - **password**: Пароль
+
+    Возвращает данные сотрудника и токен доступа для заголовка
+    Authorization: Bearer. Частота попыток ограничена по email и по IP (429);
+    за доверенным прокси (AUTH_TRUSTED_PROXIES) IP берется из X-Forwarded-For.
     """
+    ip = client_ip(
+        request.client.host if request.client else None,
+        ",".join(request.headers.getlist("x-forwarded-for"))
+    )
+    allowed, retry_after = login_limiter.check(login_dto.email, ip)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много попыток входа, повторите позже",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
     employee = await AuthService.login(db, login_dto)
-    return employee
+    access_token, expires_at = token_service.issue(employee)
+    return LoginResponse(
+        **EmployeeResponse.model_validate(employee).model_dump(),
+        accessToken=access_token,
+        expiresAt=expires_at
+    )
+
+
+@router.get("/login-limiter/stats")
+async def get_login_limiter_stats():
+    """
+    Счетчики ограничителя попыток входа (разрешено, отклонено, ключей в памяти)
+    """
+    return login_limiter.stats()
+
+
+@router.get("/me", response_model=CurrentEmployeeResponse)
+async def get_me(current: CurrentEmployee = Depends(get_current_employee)):
+    """
+    Текущий сотрудник по токену (без обращения к БД)
+    """
+    return CurrentEmployeeResponse(id=current.id, role=current.role, expiresAt=current.expires_at)
 
 
 @router.post("/create-employee", response_model=EmployeeResponse, status_code=status.HTTP_201_CREATED)
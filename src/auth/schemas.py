@@ -41,3 +41,15 @@ class EmployeeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class LoginResponse(EmployeeResponse):
+    accessToken: str
+    tokenType: str = "bearer"
+    expiresAt: int  # Срок действия токена, unix-время
+
+
+class CurrentEmployeeResponse(BaseModel):
+    id: str
+    role: str
+    expiresAt: int
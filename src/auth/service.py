@@ -2,11 +2,22 @@ from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from typing import Optional, Tuple
 from src.models import Employee
+from src.config import settings
 from src.auth.schemas import LoginDto, CreateEmployeeDto, UpdateEmployeeDto
+from src.auth.hashing import run_in_hash_pool
+from src.auth.tokens import token_service
 
-# Используем argon2 вместо bcrypt - современный алгоритм без ограничений на длину
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Используем argon2 вместо bcrypt - современный алгоритм без ограничений на длину.
+# Хэши со старыми параметрами считаются устаревшими и пересчитываются при входе
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.AUTH_ARGON2_TIME_COST,
+    argon2__memory_cost=settings.AUTH_ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.AUTH_ARGON2_PARALLELISM
+)
 
 
 class AuthService:
@@ -20,6 +31,26 @@ class AuthService:
         """Проверка пароля через argon2"""
         return pwd_context.verify(plain_password, hashed_password)
 
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Хэширование пароля в пуле потоков: argon2 занимает десятки мс и не должен блокировать цикл событий"""
+        return await run_in_hash_pool(AuthService.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля в пуле потоков"""
+        return await run_in_hash_pool(AuthService.verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Проверка пароля с пересчетом хэша в пуле потоков
+
+        Returns:
+            (пароль верен, новый хэш - если параметры argon2 изменились, иначе None)
+        """
+        return await run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
     @staticmethod
     async def login(db: AsyncSession, login_dto: LoginDto):
         result = await db.execute(
@@ -33,12 +64,23 @@ class AuthService:
                 detail="Сотрудник не найден"
             )
 
-        if not AuthService.verify_password(login_dto.password, employee.password):
+        # Завершаем читающую транзакцию до хэширования: иначе соединение пула
+        # занято на все время ожидания в очереди хэшей, и встают другие запросы
+        await db.commit()
+
+        verified, new_hash = await AuthService.verify_and_update_async(login_dto.password, employee.password)
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Сотрудник не найден"
             )
 
+        # Параметры argon2 поменялись: пароль известен только сейчас, пересчитываем хэш
+        if new_hash:
+            employee.password = new_hash
+            await db.commit()
+            await db.refresh(employee)
+
         return employee
 
     @staticmethod
@@ -55,7 +97,7 @@ class AuthService:
                 detail="Сотрудник с такой почтой уже существует"
             )
 
-        hashed_password = AuthService.hash_password(create_dto.password)
+        hashed_password = await AuthService.hash_password_async(create_dto.password)
 
         employee = Employee(
             role=create_dto.role,
@@ -96,8 +138,12 @@ class AuthService:
         update_data = update_dto.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(employee, key, value)
+        # Роль в выпущенных токенах могла устареть: отзываем их во всех воркерах
+        if update_data:
+            employee.tokenVersion = Employee.tokenVersion + 1
 
         await db.commit()
+        token_service.forget_employee(employee.id)
         await db.refresh(employee)
 
         return employee
@@ -118,6 +164,8 @@ class AuthService:
 
         await db.delete(employee)
         await db.commit()
+        # Токены удаленного сотрудника отклоняются: строки в БД больше нет
+        token_service.forget_employee(employee.id)
 
         return employee
 
@@ -0,0 +1,208 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import get_db
+from src.models import Employee
+
+logger = logging.getLogger(__name__)
+
+# Сколько проверенных токенов держать в памяти
+TOKEN_CACHE_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class CurrentEmployee:
+    """Сотрудник из проверенного токена (без обращения к БД)"""
+    id: str
+    role: str
+    issued_at: int  # unix-время в миллисекундах
+    expires_at: int
+    token_version: int = 0  # Employee.tokenVersion на момент выпуска
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenService:
+    """
+    Подписанные токены доступа
+
+    Токен - base64(JSON с id, ролью, сроком и версией токенов сотрудника)
+    и HMAC-SHA256 подпись, поэтому подпись и срок проверяются без БД.
+    Проверенные токены кэшируются (LRU), повторная проверка - поиск в словаре.
+
+    Отзыв хранится в БД: при смене данных сотрудника растет Employee.tokenVersion,
+    при удалении строки нет. Актуальная версия сотрудника кэшируется на
+    AUTH_TOKEN_VERSION_CHECK_SECONDS, поэтому отзыв виден всем воркерам
+    не позже чем через этот интервал и переживает перезапуск.
+    """
+
+    def __init__(self, secret_key: str, ttl_seconds: int, version_check_seconds: float,
+                 cache_size: int = TOKEN_CACHE_SIZE):
+        self._key = secret_key.encode()
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, CurrentEmployee]" = OrderedDict()
+        # id сотрудника -> (tokenVersion или None для удаленного, время проверки)
+        self._versions: "OrderedDict[str, Tuple[Optional[int], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, employee: Employee) -> Tuple[str, int]:
+        """Выпустить токен, вернуть (токен, срок действия unix-время)"""
+        now_ms = time.time_ns() // 1_000_000
+        expires_at = now_ms // 1000 + self.ttl_seconds
+        role = employee.role.value if hasattr(employee.role, "value") else str(employee.role)
+        payload = _b64encode(json.dumps(
+            {"sub": employee.id, "role": role, "iat": now_ms, "exp": expires_at, "ver": employee.tokenVersion or 0},
+            separators=(",", ":")
+        ).encode())
+        return f"{payload}.{self._sign(payload)}", expires_at
+
+    def _decode(self, token: str) -> Optional[CurrentEmployee]:
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+            return CurrentEmployee(
+                id=claims["sub"],
+                role=claims["role"],
+                issued_at=int(claims["iat"]),
+                expires_at=int(claims["exp"]),
+                token_version=int(claims.get("ver", 0))
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def verify(self, token: str) -> Optional[CurrentEmployee]:
+        """Проверить подпись и срок токена (без БД): None, если токен недействителен"""
+        employee = self._cache.get(token)
+        if employee is not None:
+            self.hits += 1
+            self._cache.move_to_end(token)
+        else:
+            self.misses += 1
+            employee = self._decode(token)
+            if employee is None:
+                return None
+            self._cache[token] = employee
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if employee.expires_at <= time.time():
+            self._cache.pop(token, None)
+            return None
+        return employee
+
+    async def is_current(self, db: AsyncSession, employee: CurrentEmployee) -> bool:
+        """Не отозван ли токен: сотрудник существует и версия его токенов не изменилась"""
+        now = time.monotonic()
+        cached = self._versions.get(employee.id)
+        if cached is not None and now - cached[1] < self.version_check_seconds:
+            version = cached[0]
+            self._versions.move_to_end(employee.id)
+        else:
+            result = await db.execute(select(Employee.tokenVersion).where(Employee.id == employee.id))
+            version = result.scalar_one_or_none()
+            self._versions[employee.id] = (version, now)
+            self._versions.move_to_end(employee.id)
+            if len(self._versions) > self.cache_size:
+                self._versions.popitem(last=False)
+        return version is not None and version == employee.token_version
+
+    def forget_employee(self, employee_id: str) -> None:
+        """Сбросить кэш версии сотрудника: свой воркер увидит отзыв сразу"""
+        self._versions.pop(employee_id, None)
+
+
+# Без AUTH_SECRET_KEY ключ случайный: токены не переживут перезапуск и не подходят другим воркерам
+token_service = TokenService(
+    settings.AUTH_SECRET_KEY or secrets.token_urlsafe(32),
+    settings.AUTH_TOKEN_TTL_SECONDS,
+    settings.AUTH_TOKEN_VERSION_CHECK_SECONDS
+)
+
+
+def check_secret_key() -> None:
+    """
+    Проверить ключ подписи при запуске
+
+    Без AUTH_SECRET_KEY токен одного воркера не проходит проверку в другом,
+    а число воркеров (uvicorn --workers N) изнутри процесса надежно не узнать,
+    поэтому ключ обязателен. Случайный ключ допускается только с флагом
+    разработки AUTH_ALLOW_RANDOM_SECRET и заведомо одним воркером.
+    """
+    if settings.AUTH_SECRET_KEY:
+        return
+    if not settings.AUTH_ALLOW_RANDOM_SECRET:
+        raise RuntimeError(
+            "AUTH_SECRET_KEY не задан. Задайте общий для всех воркеров ключ "
+            "(для локальной разработки с одним воркером - AUTH_ALLOW_RANDOM_SECRET=true)"
+        )
+    if settings.WEB_CONCURRENCY > 1 or "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        raise RuntimeError(
+            "AUTH_SECRET_KEY не задан, а воркеров несколько: токены одного воркера "
+            "будут отклоняться другими. Задайте общий AUTH_SECRET_KEY"
+        )
+    logger.warning(
+        "AUTH_SECRET_KEY не задан: токены подписываются случайным ключом "
+        "и станут недействительны после перезапуска"
+    )
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_optional_employee(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[CurrentEmployee]:
+    """Текущий сотрудник по заголовку Authorization: Bearer, если он передан"""
+    if credentials is None:
+        return None
+    employee = token_service.verify(credentials.credentials)
+    if employee is None or not await token_service.is_current(db, employee):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Недействительный или просроченный токен",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return employee
+
+
+async def get_current_employee(
+    employee: Optional[CurrentEmployee] = Depends(get_optional_employee)
+) -> CurrentEmployee:
+    """Текущий сотрудник, токен обязателен"""
+    if employee is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Требуется авторизация",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return employee
@@ -3,6 +3,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     BACKEND_PORT: int
+    # Число воркеров (uvicorn и gunicorn берут из него значение --workers по умолчанию)
+    WEB_CONCURRENCY: int = 1
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_HOST: str
@@ -10,6 +12,79 @@ class Settings(BaseSettings):
     POSTGRES_DATABASE: str
     POSTGRES_URI: str
 
+    # Пул соединений с БД (размер подбирать под число воркеров: воркеры * (size + overflow) <= max_connections)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # Ожидание свободного соединения, с
+    DB_POOL_RECYCLE: int = 1800  # Пересоздавать соединения старше, с (-1 - никогда)
+    DB_POOL_PRE_PING: bool = False  # Проверять соединение перед выдачей (лишний запрос на каждую выдачу)
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Кэш подготовленных запросов asyncpg (0 - для pgbouncer)
+    DB_ECHO: bool = False  # Логировать SQL (только для отладки)
+
+    # Логирование
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # Уровни по модулям: "src.product=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_FORMAT: str = "json"  # json или text
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Доля записываемых DEBUG-строк
+
+    # Учет запросов к БД на HTTP-запрос (Server-Timing, медленные запросы, N+1)
+    SQL_INSTRUMENTATION: bool = True
+    SQL_SLOW_REQUEST_MS: float = 500  # Писать в лог запросы дольше, мс
+    SQL_SLOW_REQUEST_QUERIES: int = 50  # ... или с большим числом запросов к БД
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # Повторов одной формы запроса для предупреждения о N+1
+
+    # Метрики Prometheus на /metrics (для нескольких воркеров задать PROMETHEUS_MULTIPROC_DIR)
+    METRICS_ENABLED: bool = True
+
+    # Проверки готовности (/health/ready)
+    HEALTH_DB_CACHE_SECONDS: float = 2.0  # Сколько держать результат SELECT 1
+    HEALTH_DB_TIMEOUT_SECONDS: float = 2.0
+    HEALTH_POOL_SATURATION: float = 0.9  # Доля занятых соединений, при которой воркер не готов
+
+    # Сколько хранить рекомендации по дозаказу (продажи в других воркерах кэш не сбрасывают), с
+    REORDER_CACHE_TTL_SECONDS: float = 60
+
+    # Как часто шкала скидок сверяется с БД (изменения из других воркеров), с
+    DISCOUNT_TIMELINE_CHECK_SECONDS: float = 1.0
+
+    # Каталог колоночного снимка продаж (export_sales_facts)
+    SALES_FACTS_DIR: str = "data/sales_facts"
+
+    # Потоков для хэширования паролей argon2 (вне цикла событий); 0 - по числу CPU
+    # минус один, чтобы циклу событий оставалось процессорное время
+    AUTH_HASH_WORKERS: int = 0
+    # Сколько хэшей может ждать и выполняться одновременно; сверх этого - сразу 503
+    # (защита от наплыва: очередь из 100 хэшей на 1 CPU - это уже около 25 с ожидания)
+    AUTH_HASH_MAX_PENDING: int = 100
+    # Параметры argon2 (по умолчанию как в passlib); при изменении хэши пересчитываются при входе
+    AUTH_ARGON2_TIME_COST: int = 3
+    AUTH_ARGON2_MEMORY_COST: int = 65536  # КиБ
+    AUTH_ARGON2_PARALLELISM: int = 4
+    # Целевое время хэширования для подбора параметров (benchmarks/argon2_params.py)
+    AUTH_ARGON2_TARGET_MS: int = 250
+
+    # Ключ подписи токенов доступа, обязателен
+    AUTH_SECRET_KEY: str = ""
+    # Разработка: без AUTH_SECRET_KEY подписывать случайным ключом процесса (один воркер)
+    AUTH_ALLOW_RANDOM_SECRET: bool = False
+    AUTH_TOKEN_TTL_SECONDS: int = 12 * 60 * 60
+    # Как долго воркер доверяет закэшированной версии токенов сотрудника (задержка отзыва), с
+    AUTH_TOKEN_VERSION_CHECK_SECONDS: float = 5.0
+    # Продажа без токена по ?employee_id= (старые клиенты без входа): не проверяет,
+    # кто продает, поэтому выключено, включать только на время миграции клиентов
+    AUTH_ALLOW_EMPLOYEE_ID_PARAM: bool = False
+
+    # Ограничение попыток входа: запас попыток и скорость восполнения
+    AUTH_LOGIN_RATE_LIMIT_ENABLED: bool = True  # false - только для нагрузочных тестов
+    AUTH_LOGIN_EMAIL_BURST: int = 5
+    AUTH_LOGIN_EMAIL_PER_MINUTE: float = 5
+    AUTH_LOGIN_IP_BURST: int = 30
+    AUTH_LOGIN_IP_PER_MINUTE: float = 60
+    AUTH_LOGIN_LIMITER_MAX_KEYS: int = 100_000
+    # Прокси (IP или подсети через запятую), которым доверяем X-Forwarded-For:
+    # за ними лимит по IP считается по адресу клиента, а не прокси. Пусто - заголовок игнорируется
+    AUTH_TRUSTED_PROXIES: str = ""
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -1,14 +1,63 @@
+import time
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from src.config import settings
 
 # Создаем async engine
 DATABASE_URL = settings.POSTGRES_URI.replace('postgresql://', 'postgresql+asyncpg://')
 
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений со счетчиками выдачи и времени ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def recreate(self):
+        # При пересоздании пула (dispose) счетчики сохраняем
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.timeouts = self.timeouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        return pool
+
+
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
-    future=True
+    echo=settings.DB_ECHO,
+    future=True,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # Кэш подготовленных запросов SQLAlchemy и собственный кэш asyncpg
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+    }
 )
 
 # Создаем фабрику сессий
@@ -24,6 +73,23 @@ class Base(DeclarativeBase):
     pass
 
 
+def get_pool_stats() -> dict:
+    """Текущее использование пула соединений"""
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checkedOut": pool.checkedout(),
+        "checkedIn": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "maxOverflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "waitSecondsTotal": round(pool.wait_seconds_total, 6),
+        "waitSecondsMax": round(pool.wait_seconds_max, 6),
+        "waitSecondsAvg": round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0
+    }
+
+
 async def get_db():
     """Dependency для получения сессии БД"""
     async with async_session_maker() as session:
@@ -35,4 +101,3 @@ async def get_db():
             raise
         finally:
             await session.close()
-
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db
-from src.discount.schemas import DiscountCreate, DiscountResponse
-from src.discount.service import create_discount, get_all_discounts, delete_discount
+from src.discount.schemas import DiscountCreate, DiscountResponse, DiscountPreviewResponse
+from src.discount.service import create_discount, get_all_discounts, delete_discount, preview_discount
 from typing import List
 
 router = APIRouter(prefix="/discounts", tags=["discounts"])
@@ -20,6 +20,23 @@ async def create_discount_route(
         raise HTTPException(status_code=500, detail=f"Ошибка при создании скидки: {str(e)}")
 
 
+@router.post("/preview", response_model=DiscountPreviewResponse)
+async def preview_discount_route(
+    discount_data: DiscountCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Оценить влияние скидки без ее создания
+
+    Сколько товаров затронет скидка, как изменится стоимость остатков
+    и с какими действующими скидками она пересекается
+    """
+    try:
+        return await preview_discount(db, discount_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при расчете скидки: {str(e)}")
+
+
 @router.get("/", response_model=List[DiscountResponse])
 async def get_discounts_route(
     db: AsyncSession = Depends(get_db)
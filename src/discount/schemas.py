@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
+from datetime import datetime, timezone
 from src.models import Season
 
 
@@ -10,6 +11,22 @@ class DiscountCreate(BaseModel):
     colors: Optional[List[str]] = None
     seasons: Optional[List[Season]] = None
     sizes: Optional[List[str]] = None  # Теперь это ID размеров, а не значения
+    startsAt: Optional[datetime] = None  # Начало действия (None - сразу)
+    endsAt: Optional[datetime] = None  # Окончание действия (None - бессрочно)
+
+    @field_validator("startsAt", "endsAt")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # В БД время хранится в UTC без часового пояса
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def check_period(self):
+        if self.startsAt and self.endsAt and self.endsAt <= self.startsAt:
+            raise ValueError("Окончание скидки должно быть позже начала")
+        return self
 
 
 class DiscountResponse(BaseModel):
@@ -20,7 +37,29 @@ class DiscountResponse(BaseModel):
     colors: List[str]
     seasons: List[str]
     sizes: List[dict]  # Список объектов {id, value}
+    startsAt: Optional[datetime] = None
+    endsAt: Optional[datetime] = None
+    isActive: bool = True  # Действует ли скидка сейчас
 
     class Config:
         from_attributes = True
 
+
+
+class DiscountOverlapResponse(BaseModel):
+    id: str
+    name: str
+    percentage: float
+    products: int  # Сколько затронутых товаров уже под этой скидкой
+
+
+class DiscountPreviewResponse(BaseModel):
+    affectedProducts: int
+    affectedInStock: int  # Затронутые товары с ненулевым остатком
+    affectedUnits: int
+    stockValueBefore: float  # Стоимость остатков по текущим ценам со скидками
+    stockValueAfter: float
+    priceImpact: float  # На сколько уменьшится стоимость остатков
+    overlappingProducts: int  # Затронутые товары, у которых уже есть скидки
+    cappedProducts: int  # Суммарная скидка упирается в 100%
+    overlaps: List[DiscountOverlapResponse]
@@ -1,11 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, exists, or_, true
+from sqlalchemy.orm import selectinload, joinedload
 from src.models import (
     Discount, CategoryToDiscount, ColorToDiscount,
-    SeasonToDiscount, SizeToDiscount, ProductCategory, ProductColor
+    SeasonToDiscount, SizeToDiscount, Product, ShopRest
+)
+from src.discount.timeline import discount_timeline
+from src.discount.schemas import (
+    DiscountCreate, DiscountResponse, DiscountPreviewResponse, DiscountOverlapResponse
 )
-from src.discount.schemas import DiscountCreate, DiscountResponse
 from typing import List
+from datetime import datetime
 
 
 async def create_discount(db: AsyncSession, discount_data: DiscountCreate) -> DiscountResponse:
@@ -13,7 +18,9 @@ async def create_discount(db: AsyncSession, discount_data: DiscountCreate) -> Di
     # Создаем скидку
     discount = Discount(
         name=discount_data.name,
-        percentage=discount_data.percentage
+        percentage=discount_data.percentage,
+        startsAt=discount_data.startsAt,
+        endsAt=discount_data.endsAt
     )
     db.add(discount)
     await db.flush()
@@ -55,21 +62,167 @@ async def create_discount(db: AsyncSession, discount_data: DiscountCreate) -> Di
             db.add(size_discount)
 
     await db.commit()
+    discount_timeline.invalidate()
     await db.refresh(discount)
 
     return await get_discount_response(db, discount)
 
 
+def _discount_links_options():
+    """
+    Загрузка связей скидок пачкой
+
+    Каждая таблица связей читается одним запросом selectin для всех скидок
+    сразу вместе со справочником (joinedload), поэтому число запросов
+    постоянно и не зависит от количества скидок.
+    """
+    return (
+        selectinload(Discount.category_discounts).joinedload(CategoryToDiscount.category),
+        selectinload(Discount.color_discounts).joinedload(ColorToDiscount.color),
+        selectinload(Discount.season_discounts),
+        selectinload(Discount.size_discounts).joinedload(SizeToDiscount.size),
+    )
+
+
 async def get_all_discounts(db: AsyncSession) -> List[DiscountResponse]:
-    """Получить все скидки"""
-    result = await db.execute(select(Discount))
+    """Получить все скидки (5 запросов при любом количестве скидок)"""
+    result = await db.execute(select(Discount).options(*_discount_links_options()))
     discounts = result.scalars().all()
 
-    responses = []
-    for discount in discounts:
-        responses.append(await get_discount_response(db, discount))
+    return [discount_to_response(discount) for discount in discounts]
+
+
+async def preview_discount(db: AsyncSession, discount_data: DiscountCreate) -> DiscountPreviewResponse:
+    """
+    Оценить влияние скидки на каталог, не сохраняя ее
+
+    Правила совпадают с ProductService.calculate_product_discount: скидка
+    применяется, если товар подходит по каждому заданному измерению,
+    проценты применимых скидок складываются и ограничиваются 100%.
+    Пересечения считаются с действующими сейчас скидками.
+    Весь расчет - один запрос: отбор затронутых товаров, применимость
+    существующих скидок к ним и агрегаты по остаткам.
+    """
+    conditions = []
+    if discount_data.categories:
+        conditions.append(Product.categoryId.in_(discount_data.categories))
+    if discount_data.colors:
+        conditions.append(Product.colorId.in_(discount_data.colors))
+    if discount_data.seasons:
+        conditions.append(Product.season.in_(discount_data.seasons))
+    if discount_data.sizes:
+        conditions.append(Product.sizeId.in_(discount_data.sizes))
 
-    return responses
+    affected = (
+        select(
+            Product.id.label('product_id'),
+            Product.categoryId.label('category_id'),
+            Product.colorId.label('color_id'),
+            Product.season.label('season'),
+            Product.sizeId.label('size_id'),
+            Product.price.label('price'),
+            func.coalesce(ShopRest.restCount, 0).label('rest')
+        )
+        .outerjoin(ShopRest, ShopRest.productId == Product.id)
+        .where(*conditions)
+        .cte('affected')
+    )
+
+    def matches(link, link_column, product_column):
+        # Измерение не задано у скидки или товар в нем есть
+        return or_(
+            ~exists().where(link.discountId == Discount.id),
+            exists().where(link.discountId == Discount.id, link_column == product_column)
+        )
+
+    now = datetime.utcnow()
+    applicable = (
+        select(
+            affected.c.product_id,
+            Discount.id.label('discount_id'),
+            Discount.name.label('name'),
+            Discount.percentage.label('percentage')
+        )
+        .join(Discount, true())
+        .where(
+            or_(Discount.startsAt.is_(None), Discount.startsAt <= now),
+            or_(Discount.endsAt.is_(None), Discount.endsAt > now),
+            matches(CategoryToDiscount, CategoryToDiscount.categoryId, affected.c.category_id),
+            matches(ColorToDiscount, ColorToDiscount.colorId, affected.c.color_id),
+            matches(SeasonToDiscount, SeasonToDiscount.season, affected.c.season),
+            matches(SizeToDiscount, SizeToDiscount.sizeId, affected.c.size_id)
+        )
+        .cte('applicable')
+    )
+
+    existing = (
+        select(applicable.c.product_id, func.sum(applicable.c.percentage).label('percentage'))
+        .group_by(applicable.c.product_id)
+        .cte('existing')
+    )
+
+    current = func.coalesce(existing.c.percentage, 0)
+    before_percent = func.least(current, 100)
+    after_percent = func.least(current + discount_data.percentage, 100)
+    stock_price = affected.c.rest * affected.c.price
+
+    overlaps_stmt = (
+        select(
+            applicable.c.discount_id,
+            applicable.c.name,
+            applicable.c.percentage,
+            func.count().label('products')
+        )
+        .group_by(applicable.c.discount_id, applicable.c.name, applicable.c.percentage)
+        .subquery('overlaps')
+    )
+    overlaps_json = (
+        select(func.coalesce(
+            func.json_agg(
+                func.json_build_object(
+                    'id', overlaps_stmt.c.discount_id,
+                    'name', overlaps_stmt.c.name,
+                    'percentage', overlaps_stmt.c.percentage,
+                    'products', overlaps_stmt.c.products
+                )
+            ),
+            func.json_build_array()
+        ))
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            func.count().label('affected_products'),
+            func.count().filter(affected.c.rest > 0).label('affected_in_stock'),
+            func.coalesce(func.sum(affected.c.rest), 0).label('affected_units'),
+            func.coalesce(func.sum(stock_price * (1 - before_percent / 100.0)), 0).label('value_before'),
+            func.coalesce(func.sum(stock_price * (1 - after_percent / 100.0)), 0).label('value_after'),
+            func.count(existing.c.product_id).label('overlapping_products'),
+            func.count().filter(current + discount_data.percentage > 100).label('capped_products'),
+            overlaps_json.label('overlaps')
+        )
+        .select_from(affected)
+        .outerjoin(existing, existing.c.product_id == affected.c.product_id)
+    )
+    row = (await db.execute(stmt)).one()
+
+    value_before = float(row.value_before)
+    value_after = float(row.value_after)
+    return DiscountPreviewResponse(
+        affectedProducts=row.affected_products,
+        affectedInStock=row.affected_in_stock,
+        affectedUnits=int(row.affected_units),
+        stockValueBefore=round(value_before, 2),
+        stockValueAfter=round(value_after, 2),
+        priceImpact=round(value_before - value_after, 2),
+        overlappingProducts=row.overlapping_products,
+        cappedProducts=row.capped_products,
+        overlaps=sorted(
+            (DiscountOverlapResponse(**overlap) for overlap in row.overlaps),
+            key=lambda overlap: -overlap.products
+        )
+    )
 
 
 async def delete_discount(db: AsyncSession, discount_id: str):
@@ -82,49 +235,35 @@ async def delete_discount(db: AsyncSession, discount_id: str):
 
     await db.delete(discount)
     await db.commit()
+    discount_timeline.invalidate()
 
 
 async def get_discount_response(db: AsyncSession, discount: Discount) -> DiscountResponse:
-    """Преобразовать скидку в ответ"""
-    # Получаем связанные категории
-    category_result = await db.execute(
-        select(ProductCategory)
-        .join(CategoryToDiscount)
-        .where(CategoryToDiscount.discountId == discount.id)
+    """Преобразовать скидку в ответ, загрузив ее связи"""
+    result = await db.execute(
+        select(Discount)
+        .where(Discount.id == discount.id)
+        .options(*_discount_links_options())
+        .execution_options(populate_existing=True)
     )
-    categories = [cat.name for cat in category_result.scalars().all()]
+    return discount_to_response(result.scalar_one())
 
-    # Получаем связанные цвета
-    color_result = await db.execute(
-        select(ProductColor)
-        .join(ColorToDiscount)
-        .where(ColorToDiscount.discountId == discount.id)
-    )
-    colors = [color.name for color in color_result.scalars().all()]
-
-    # Получаем связанные сезоны
-    season_result = await db.execute(
-        select(SeasonToDiscount.season)
-        .where(SeasonToDiscount.discountId == discount.id)
-    )
-    seasons = [season.value for season in season_result.scalars().all()]
-
-    # Получаем связанные размеры через ProductSize
-    from src.models import ProductSize
-    size_result = await db.execute(
-        select(ProductSize)
-        .join(SizeToDiscount)
-        .where(SizeToDiscount.discountId == discount.id)
-    )
-    sizes = [{"id": size.id, "value": size.value} for size in size_result.scalars().all()]
 
+def discount_to_response(discount: Discount) -> DiscountResponse:
+    """Собрать ответ по скидке с уже загруженными связями"""
+    now = datetime.utcnow()
     return DiscountResponse(
         id=discount.id,
         name=discount.name,
         percentage=discount.percentage,
-        categories=categories,
-        colors=colors,
-        seasons=seasons,
-        sizes=sizes
+        categories=[link.category.name for link in discount.category_discounts],
+        colors=[link.color.name for link in discount.color_discounts],
+        seasons=[link.season.value for link in discount.season_discounts],
+        sizes=[{"id": link.size.id, "value": link.size.value} for link in discount.size_discounts],
+        startsAt=discount.startsAt,
+        endsAt=discount.endsAt,
+        isActive=(
+            (discount.startsAt is None or discount.startsAt <= now)
+            and (discount.endsAt is None or discount.endsAt > now)
+        )
     )
-
@@ -0,0 +1,185 @@
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.config import settings
+from src.models import Discount, Product
+
+
+@dataclass(frozen=True)
+class DiscountRule:
+    """Условия скидки в памяти: пустое множество - измерение не ограничено"""
+    id: str
+    percentage: float
+    startsAt: Optional[datetime]
+    endsAt: Optional[datetime]
+    category_ids: FrozenSet[str]
+    color_ids: FrozenSet[str]
+    seasons: FrozenSet[str]
+    size_ids: FrozenSet[str]
+
+    def active_from(self, moment: Optional[datetime]) -> bool:
+        """Действует ли скидка на отрезке, начинающемся в moment (None - минус бесконечность)"""
+        if self.startsAt is not None and (moment is None or self.startsAt > moment):
+            return False
+        return self.endsAt is None or moment is None or self.endsAt > moment
+
+    def applies_to(self, product: Product) -> bool:
+        return (
+            (not self.category_ids or product.categoryId in self.category_ids)
+            and (not self.color_ids or product.colorId in self.color_ids)
+            and (not self.seasons or product.season.value in self.seasons)
+            and (not self.size_ids or product.sizeId in self.size_ids)
+        )
+
+
+class DiscountTimeline:
+    """
+    Предрассчитанная шкала действия скидок
+
+    Все начала и окончания скидок образуют отсортированный список границ,
+    для каждого отрезка между границами заранее известен набор действующих
+    скидок. Поиск действующих скидок - bisect по границам, O(log n).
+    Скидки товаров кэшируются в пределах отрезка и сбрасываются ровно
+    при переходе через границу, а вся шкала - при создании или удалении скидки.
+
+    Другие воркеры об инвалидации не знают, поэтому не чаще раза в
+    check_seconds шкала сверяет с БД отпечаток таблицы скидок (число строк
+    и максимальный xmin) и перечитывает скидки, если он изменился.
+    """
+
+    def __init__(self, check_seconds: float = 0.0):
+        self.check_seconds = check_seconds
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._boundaries: Optional[List[datetime]] = None
+        self._segments: List[Tuple[DiscountRule, ...]] = []
+        # Растет при каждой инвалидации; шкала актуальна, если построена по этой версии
+        self.version = 0
+        self._built_version: Optional[int] = None
+        self._cache_segment: Optional[int] = None
+        self._cache: Dict[Tuple[str, str, str, str], float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        """Пометить шкалу устаревшей: она перечитается при следующем load()"""
+        self.version += 1
+
+    def build(self, rules: List[DiscountRule]) -> None:
+        """Построить шкалу по списку скидок"""
+        boundaries = sorted({
+            moment
+            for rule in rules
+            for moment in (rule.startsAt, rule.endsAt)
+            if moment is not None
+        })
+        # Отрезок 0 - до первой границы, отрезок i - с boundaries[i - 1]
+        starts = [None] + boundaries
+        self._segments = [
+            tuple(rule for rule in rules if rule.active_from(start))
+            for start in starts
+        ]
+        self._boundaries = boundaries
+        self._cache_segment = None
+        self._cache = {}
+
+    async def load(self, db: AsyncSession) -> None:
+        """Загрузить скидки из БД, если шкала не построена или устарела"""
+        if self._boundaries is not None and self._built_version == self.version:
+            if time.monotonic() - self._checked_at < self.check_seconds:
+                return
+            fingerprint = await self._read_fingerprint(db)
+            self._checked_at = time.monotonic()
+            if fingerprint == self._fingerprint:
+                return
+            # Скидки изменены в другом процессе
+            self.invalidate()
+
+        version = self.version
+        # Отпечаток до чтения строк: изменение между запросами даст новый отпечаток и перечитывание
+        fingerprint = await self._read_fingerprint(db)
+        result = await db.execute(
+            select(Discount).options(
+                selectinload(Discount.category_discounts),
+                selectinload(Discount.color_discounts),
+                selectinload(Discount.season_discounts),
+                selectinload(Discount.size_discounts)
+            )
+        )
+        rules = [
+            DiscountRule(
+                id=discount.id,
+                percentage=discount.percentage,
+                startsAt=discount.startsAt,
+                endsAt=discount.endsAt,
+                category_ids=frozenset(link.categoryId for link in discount.category_discounts),
+                color_ids=frozenset(link.colorId for link in discount.color_discounts),
+                seasons=frozenset(link.season.value for link in discount.season_discounts),
+                size_ids=frozenset(link.sizeId for link in discount.size_discounts)
+            )
+            for discount in result.scalars().all()
+        ]
+        # Строим и при инвалидации во время чтения: вызывающий сразу читает шкалу.
+        # Версия тогда не совпадет, и следующий load() перечитает скидки.
+        # Результат более раннего чтения не затирает шкалу более позднего.
+        if self._built_version is None or version >= self._built_version:
+            self.build(rules)
+            self._built_version = version
+            self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    async def _read_fingerprint(db: AsyncSession) -> Tuple[int, int]:
+        """Число скидок и максимальный xmin: меняется при любом создании или удалении скидки"""
+        result = await db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.max(literal_column('"Discount".xmin::text::bigint')), 0)
+            ).select_from(Discount)
+        )
+        count, max_xmin = result.one()
+        return count, max_xmin
+
+    def _segment(self, now: datetime) -> int:
+        if self._boundaries is None:
+            raise RuntimeError("Шкала скидок не загружена: сначала вызовите load()")
+        return bisect_right(self._boundaries, now)
+
+    def active(self, now: Optional[datetime] = None) -> Tuple[DiscountRule, ...]:
+        """Скидки, действующие в момент now (шкала должна быть загружена)"""
+        return self._segments[self._segment(now or datetime.utcnow())]
+
+    def next_boundary(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Ближайший момент, когда изменится набор действующих скидок"""
+        index = self._segment(now or datetime.utcnow())
+        return self._boundaries[index] if index < len(self._boundaries) else None
+
+    def product_discount(self, product: Product, now: Optional[datetime] = None) -> float:
+        """Суммарная скидка товара в момент now, не больше 100%"""
+        segment = self._segment(now or datetime.utcnow())
+        if segment != self._cache_segment:
+            self._cache_segment = segment
+            self._cache = {}
+
+        # Скидка зависит только от атрибутов товара, а не от самого товара
+        key = (product.categoryId, product.colorId, product.season.value, product.sizeId)
+        percentage = self._cache.get(key)
+        if percentage is None:
+            self.misses += 1
+            total = sum(rule.percentage for rule in self._segments[segment] if rule.applies_to(product))
+            percentage = self._cache[key] = min(total, 100.0)
+        else:
+            self.hits += 1
+        return percentage
+
+
+# Общая для процесса шкала, сбрасывается сервисом скидок после коммита
+# и сверяется с БД ради изменений из других воркеров
+discount_timeline = DiscountTimeline(settings.DISCOUNT_TIMELINE_CHECK_SECONDS)
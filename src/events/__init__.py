@@ -0,0 +1,2 @@
+# Events module
+
@@ -0,0 +1,83 @@
+import asyncio
+import itertools
+from datetime import datetime
+from typing import Any, Iterable, Optional, Set
+
+
+class Subscription:
+    """Подписка на события с ограниченной очередью"""
+
+    def __init__(self, topics: Optional[Iterable[str]], max_queue: int):
+        self.topics: Optional[Set[str]] = set(topics) if topics else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+
+class EventHub:
+    """
+    Внутрипроцессная рассылка событий подписчикам (SSE)
+
+    Темы: sale (продажа), stock (остатки после продажи или поставки),
+    delivery (поставка), import (ход импорта накладной), resync (служебная,
+    клиенту нужно перечитать состояние).
+
+    publish не блокирует и не ждёт медленных клиентов: если очередь
+    подписчика переполнена, она очищается и в неё кладётся одно событие
+    resync - клиент должен перечитать состояние через REST.
+    """
+
+    def __init__(self, max_queue: int = 256, max_subscribers: int = 1000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+
+    @property
+    def subscribers_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise RuntimeError("Превышено количество подписчиков")
+        subscription = Subscription(topics, self.max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, topic: str, data: Any) -> None:
+        """Разослать событие всем подписчикам темы"""
+        if not self._subscribers:
+            return
+
+        event = {
+            "id": next(self._ids),
+            "topic": topic,
+            "data": data,
+            "createdAt": datetime.utcnow().isoformat()
+        }
+        for subscription in list(self._subscribers):
+            if not subscription.wants(topic):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Клиент не успевает: сбрасываем накопленное и просим пересинхронизироваться
+                subscription.dropped += 1
+                while not subscription.queue.empty():
+                    if subscription.queue.get_nowait()["topic"] != "resync":
+                        subscription.dropped += 1
+                subscription.queue.put_nowait({
+                    "id": event["id"],
+                    "topic": "resync",
+                    "data": {"dropped": subscription.dropped},
+                    "createdAt": event["createdAt"]
+                })
+
+
+# Общий для процесса хаб, события публикуются из сервисов после коммита
+event_hub = EventHub()
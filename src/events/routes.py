@@ -0,0 +1,66 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from src.events.hub import event_hub
+
+router = APIRouter(prefix="/events")
+
+# Интервал комментариев-пингов, чтобы прокси не закрывали простаивающее соединение
+KEEPALIVE_SECONDS = 15
+
+
+def format_sse(event: dict) -> str:
+    """Сериализовать событие в формат text/event-stream"""
+    payload = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {payload}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[List[str]] = Query(None, description="Темы: sale, stock, delivery, import (по умолчанию все)")
+):
+    """
+    Поток событий (Server-Sent Events)
+
+    - **sale**: новая продажа (сумма, сотрудник, позиции)
+    - **stock**: новые остатки товаров после продажи или поставки
+    - **delivery**: поступление товаров от поставщика
+    - **import**: ход импорта накладной поставщика (обработано, загружено, ошибок)
+    - **resync**: клиент не успевал читать поток, нужно перечитать данные через REST
+    """
+    if event_hub.subscribers_count >= event_hub.max_subscribers:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Превышено количество подписчиков")
+
+    async def event_stream():
+        # Подписка внутри генератора: finally отписывает и тогда, когда поток
+        # закрыт до первого события (клиент отключился, ответ не начал отправляться)
+        try:
+            subscription = event_hub.subscribe(topics)
+        except RuntimeError:
+            # Места заняли между проверкой выше и началом потока
+            yield "retry: 3000\n\n"
+            return
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
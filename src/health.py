@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import engine, get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseProbe:
+    """
+    Проверка БД запросом SELECT 1 через пул
+
+    Результат кэшируется на HEALTH_DB_CACHE_SECONDS: частые пробы балансировщика
+    и нескольких воркеров не нагружают Postgres. Одновременные пробы ждут
+    один общий запрос.
+    """
+
+    def __init__(self, cache_seconds: float, timeout_seconds: float):
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self._checked_at = 0.0
+        self._ok = False
+        self._error: Optional[str] = None
+        self._latency_ms: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._checked_at > 0 and time.monotonic() - self._checked_at < self.cache_seconds
+
+    async def check(self) -> dict:
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    await self._run()
+        return {
+            "ok": self._ok,
+            "latencyMs": self._latency_ms,
+            "error": self._error,
+            "checkedSecondsAgo": round(time.monotonic() - self._checked_at, 3)
+        }
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            self._ok, self._error = True, None
+        except Exception as e:
+            if self._ok or self._checked_at == 0:
+                logger.warning("Проверка БД не прошла: %r", e)
+            self._ok, self._error = False, repr(e)
+        self._latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self._checked_at = time.monotonic()
+
+
+database_probe = DatabaseProbe(settings.HEALTH_DB_CACHE_SECONDS, settings.HEALTH_DB_TIMEOUT_SECONDS)
+
+
+def pool_saturation() -> dict:
+    """Доля занятых соединений от максимума пула (size + max_overflow)"""
+    pool = get_pool_stats()
+    capacity = pool["size"] + pool["maxOverflow"]
+    return {
+        "checkedOut": pool["checkedOut"],
+        "capacity": capacity,
+        "saturation": round(pool["checkedOut"] / capacity, 3) if capacity else 1.0,
+        "timeouts": pool["timeouts"]
+    }
+
+
+async def readiness() -> dict:
+    """
+    Готовность принимать трафик
+
+    Воркер не готов, если пул почти исчерпан (тогда БД не проверяем: проба
+    встала бы в ту же очередь за соединением) или БД не отвечает.
+    """
+    pool = pool_saturation()
+    if pool["saturation"] >= settings.HEALTH_POOL_SATURATION:
+        return {"ready": False, "reason": "pool_saturated", "pool": pool, "database": None}
+
+    database = await database_probe.check()
+    return {
+        "ready": database["ok"],
+        "reason": None if database["ok"] else "database_unavailable",
+        "pool": pool,
+        "database": database
+    }
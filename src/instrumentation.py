@@ -0,0 +1,130 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Список параметров "($1::VARCHAR, $2::VARCHAR, ...)" любой длины - одна форма запроса
+_PARAM = r"\$\d+(?:::[\w ]+(?:\[\])?)?"
+_PARAM_LIST_RE = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_PARAM_RE = re.compile(_PARAM)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: текст без значений параметров и длины списков IN"""
+    shape = _PARAM_LIST_RE.sub("(?)", statement)
+    shape = _PARAM_RE.sub("?", shape)
+    return _SPACES_RE.sub(" ", shape).strip()
+
+
+class RequestSqlStats:
+    """Запросы к БД в рамках одного HTTP-запроса"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Формы, выполненные не меньше threshold раз - вероятный N+1"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+# Статистика текущего запроса (None вне HTTP-запроса: скрипты, миграции)
+request_sql_stats: ContextVar[Optional[RequestSqlStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_sql_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_sql_stats.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.add(statement, time.perf_counter() - started.pop())
+
+
+def install_sql_instrumentation(engine: Engine) -> None:
+    """Подписаться на выполнение запросов движка (sync_engine для async)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SqlInstrumentationMiddleware:
+    """
+    ASGI middleware: число запросов к БД и время в БД на каждый HTTP-запрос
+
+    Итоги уходят в заголовок Server-Timing (db и app). Запросы дольше
+    SQL_SLOW_REQUEST_MS или с числом запросов к БД от SQL_SLOW_REQUEST_QUERIES
+    пишутся в лог, как и формы запросов, повторенные не меньше
+    SQL_N_PLUS_ONE_THRESHOLD раз (вероятный N+1). Пути exclude_paths
+    (долгоживущие потоки) не замеряются: иначе каждый закрытый поток
+    попадал бы в лог как медленный запрос.
+    """
+
+    def __init__(self, app, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats()
+        token = request_sql_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"app;dur={elapsed_ms:.1f}"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_sql_stats.reset(token)
+            self._report(scope, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def _report(scope, stats: RequestSqlStats, seconds: float) -> None:
+        fields: Dict[str, object] = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "queries": stats.queries,
+            "dbMs": round(stats.seconds * 1000, 1),
+            "durationMs": round(seconds * 1000, 1)
+        }
+        if seconds * 1000 >= settings.SQL_SLOW_REQUEST_MS or stats.queries >= settings.SQL_SLOW_REQUEST_QUERIES:
+            logger.warning(
+                "Медленный запрос %s %s: %d запросов к БД, %.1f мс в БД, всего %.1f мс",
+                fields["method"], fields["path"], stats.queries, fields["dbMs"], fields["durationMs"],
+                extra=fields
+            )
+        for shape, count in stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+            logger.warning(
+                "Вероятный N+1 в %s %s: запрос выполнен %d раз: %s",
+                fields["method"], fields["path"], count, shape[:500],
+                extra={**fields, "repeats": count, "statement": shape[:500]}
+            )
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.auth.routes import router as auth_router
@@ -6,7 +9,26 @@ from src.product.routes import router as product_router
 from src.supplier.routes import router as supplier_router
 from src.discount.routes import router as discount_router
 from src.reports.routes import router as reports_router
+from src.events.routes import router as events_router
+from src.auth.hashing import shutdown_hash_executor
+from src.auth.tokens import check_secret_key
 from src.config import settings
+from src.database import engine, get_pool_stats
+from src.health import database_probe, readiness
+from src.instrumentation import install_sql_instrumentation, SqlInstrumentationMiddleware
+from src.metrics import MetricsMiddleware, render_metrics, mark_process_dead
+from src.log import setup_logging, shutdown_logging, RequestIdMiddleware
+
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_secret_key()
+    yield
+    shutdown_hash_executor()
+    mark_process_dead()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -20,6 +42,7 @@ app = FastAPI(
 - **Suppliers** - Управление поставщиками и заказами
 - **Discounts** - Управление скидками
 - **Reports** - Отчеты по сотрудникам и товарам
+- **Events** - Поток изменений продаж и остатков (SSE)
 
 ### Документация:
 - Swagger UI: http://localhost:8008/docs
@@ -29,7 +52,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS
@@ -39,7 +63,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Server-Timing"],
 )
+# Долгоживущие потоки (SSE): длительность - время подключения, а не задержка ответа
+LONG_LIVED_PATHS = ("/events/stream",)
+if settings.SQL_INSTRUMENTATION:
+    install_sql_instrumentation(engine.sync_engine)
+    app.add_middleware(SqlInstrumentationMiddleware, exclude_paths=LONG_LIVED_PATHS)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, exclude_paths=LONG_LIVED_PATHS)
+# Последним, чтобы ID запроса был и в логах внутренних middleware
+app.add_middleware(RequestIdMiddleware)
 
 # Роутеры
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
@@ -47,6 +81,7 @@ app.include_router(product_router, prefix="/products", tags=["Products"])
 app.include_router(supplier_router, tags=["Suppliers"])  # Prefix уже установлен в routes.py
 app.include_router(discount_router, tags=["Discounts"])  # Prefix уже установлен в routes.py
 app.include_router(reports_router, tags=["Reports"])  # Prefix уже установлен в routes.py
+app.include_router(events_router, tags=["Events"])  # Prefix уже установлен в routes.py
 
 
 @app.get("/", tags=["Root"])
@@ -88,15 +123,59 @@ async def health():
     """
     Health check endpoint
 
-    Проверка работоспособности API
+    Проверка работоспособности API и доступности БД (результат проверки БД кэшируется)
     """
+    database = await database_probe.check()
     return {
-        "status": "healthy",
+        "status": "healthy" if database["ok"] else "degraded",
         "api": "running",
-        "database": "connected"
+        "database": "connected" if database["ok"] else "unavailable"
     }
 
 
+@app.get("/health/live", tags=["Health"])
+async def health_live():
+    """
+    Liveness: процесс жив и цикл событий отвечает
+
+    БД не проверяется, чтобы сбой Postgres не приводил к перезапуску всех воркеров
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def health_ready():
+    """
+    Readiness: можно ли направлять трафик на воркер
+
+    503, если БД не отвечает на SELECT 1 (результат кэшируется на
+    HEALTH_DB_CACHE_SECONDS) или пул занят на HEALTH_POOL_SATURATION и больше
+    """
+    result = await readiness()
+    return JSONResponse(
+        content=result,
+        status_code=status.HTTP_200_OK if result["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@app.get("/health/pool", tags=["Health"])
+async def health_pool():
+    """
+    Использование пула соединений с БД
+
+    Выдано и свободно соединений, overflow, число выдач, таймауты
+    и время ожидания свободного соединения
+    """
+    return get_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus (при нескольких воркерах - сумма по всем)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,176 @@
+import os
+import time
+from typing import Iterable, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+from src.auth.tokens import token_service
+from src.database import get_pool_stats
+from src.discount.timeline import discount_timeline
+from src.supplier.reorder import reorder_cache
+
+# Режим нескольких воркеров uvicorn: каждый процесс пишет метрики в файлы
+# этого каталога, /metrics любого воркера отдает сумму по всем процессам.
+# Переменную нужно задать до запуска (каталог пустой при старте).
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Состояние пула и кэшей процесса переносим в метрики не чаще, с
+PROCESS_GAUGES_INTERVAL = 1.0
+
+# HTTP
+REQUEST_LATENCY = Histogram(
+    "erp_http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "erp_http_requests_in_flight",
+    "HTTP-запросы в обработке",
+    multiprocess_mode="livesum"
+)
+
+# Пул соединений с БД (сумма по живым воркерам)
+DB_POOL_CONNECTIONS = Gauge(
+    "erp_db_pool_connections",
+    "Соединения пула по состоянию",
+    ["state"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUTS = Gauge(
+    "erp_db_pool_checkouts",
+    "Выдач соединений из пула с запуска процесса",
+    multiprocess_mode="livesum"
+)
+DB_POOL_TIMEOUTS = Gauge(
+    "erp_db_pool_timeouts",
+    "Таймаутов ожидания свободного соединения с запуска процесса",
+    multiprocess_mode="livesum"
+)
+DB_POOL_WAIT_SECONDS = Gauge(
+    "erp_db_pool_wait_seconds",
+    "Суммарное ожидание свободного соединения с запуска процесса, с",
+    multiprocess_mode="livesum"
+)
+
+# Кэши процесса
+CACHE_LOOKUPS = Gauge(
+    "erp_cache_lookups",
+    "Обращений к кэшу с запуска процесса",
+    ["cache", "result"],
+    multiprocess_mode="livesum"
+)
+CACHE_HIT_RATIO = Gauge(
+    "erp_cache_hit_ratio",
+    "Доля попаданий в кэш",
+    ["cache"],
+    multiprocess_mode="liveall"
+)
+
+# Бизнес-счетчики
+SALES_CREATED = Counter("erp_sales_created", "Созданных продаж")
+UNITS_SOLD = Counter("erp_units_sold", "Проданных единиц товара")
+SALES_REVENUE = Counter("erp_sales_revenue", "Выручка по продажам")
+DELIVERIES_RECEIVED = Counter("erp_deliveries_received", "Принятых заказов поставщикам")
+UNITS_RECEIVED = Counter("erp_units_received", "Принятых единиц товара")
+
+_CACHES = {
+    "reorder": reorder_cache,
+    "discount_timeline": discount_timeline,
+    "token": token_service
+}
+
+_process_gauges_updated = 0.0
+
+
+def update_process_gauges(force: bool = False) -> None:
+    """Перенести в метрики состояние пула и кэшей текущего процесса"""
+    global _process_gauges_updated
+    now = time.monotonic()
+    if not force and now - _process_gauges_updated < PROCESS_GAUGES_INTERVAL:
+        return
+    _process_gauges_updated = now
+
+    pool = get_pool_stats()
+    DB_POOL_CONNECTIONS.labels("checked_out").set(pool["checkedOut"])
+    DB_POOL_CONNECTIONS.labels("checked_in").set(pool["checkedIn"])
+    DB_POOL_CONNECTIONS.labels("overflow").set(pool["overflow"])
+    DB_POOL_CHECKOUTS.set(pool["checkouts"])
+    DB_POOL_TIMEOUTS.set(pool["timeouts"])
+    DB_POOL_WAIT_SECONDS.set(pool["waitSecondsTotal"])
+
+    for name, cache in _CACHES.items():
+        hits, misses = cache.hits, cache.misses
+        CACHE_LOOKUPS.labels(name, "hit").set(hits)
+        CACHE_LOOKUPS.labels(name, "miss").set(misses)
+        CACHE_HIT_RATIO.labels(name).set(hits / (hits + misses) if hits + misses else 0.0)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Метрики в текстовом формате Prometheus: (тело, content-type)"""
+    update_process_gauges(force=True)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Убрать live-метрики завершающегося воркера из суммы"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: время ответа по шаблону маршрута, методу и статусу
+    и число запросов в обработке
+
+    Маршрут берется из шаблона (/products/{product_id}), а не из пути,
+    чтобы число рядов гистограммы не зависело от ID в URL. Пути exclude_paths
+    (долгоживущие потоки) не учитываются: их длительность - время подключения
+    клиента, а не задержка ответа.
+    """
+
+    def __init__(self, app, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route is not None else "<unmatched>",
+                str(status_code)
+            ).observe(elapsed)
+            update_process_gauges()
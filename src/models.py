@@ -1,4 +1,7 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Enum as SQLEnum, ForeignKey
+from sqlalchemy import (
+    Column, String, Integer, Float, Date, DateTime, Enum as SQLEnum, ForeignKey,
+    UniqueConstraint, Index
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -33,6 +36,8 @@ class Employee(Base):
     patronymic = Column(String, nullable=True)
     email = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
+    # Растет при изменении сотрудника: токены с прежней версией отозваны
+    tokenVersion = Column(Integer, nullable=False, default=0, server_default="0")
 
     sales = relationship("Sale", back_populates="employee")
 
@@ -87,6 +92,20 @@ class Product(Base):
     orders_to_supplier = relationship("OrderToSupplier", back_populates="product", cascade="all, delete-orphan")
 
 
+class ProductPriceHistory(Base):
+    """История цены товара: запись появляется только при изменении цены"""
+    __tablename__ = "ProductPriceHistory"
+
+    id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    productId = Column(String, ForeignKey("Product.id", ondelete="CASCADE"), nullable=False)
+    price = Column(Float, nullable=False)
+    validFrom = Column(DateTime, default=datetime.utcnow, nullable=False)  # Цена действует с этого момента
+
+    __table_args__ = (
+        Index("ix_ProductPriceHistory_productId_validFrom", "productId", "validFrom"),
+    )
+
+
 class ShopRest(Base):
     __tablename__ = "ShopRest"
 
@@ -97,6 +116,17 @@ class ShopRest(Base):
     product = relationship("Product", back_populates="shop_rest")
 
 
+class ProductCost(Base):
+    """Учётная себестоимость товара (скользящая средневзвешенная)"""
+    __tablename__ = "ProductCost"
+
+    id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    productId = Column(String, ForeignKey("Product.id", ondelete="CASCADE"), unique=True, nullable=False)
+    stockCount = Column(Integer, nullable=False, default=0)  # Остаток, по которому считается средняя
+    avgCost = Column(Float, nullable=False, default=0)  # Средняя цена закупки за штуку
+    updatedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class Sale(Base):
     __tablename__ = "Sale"
 
@@ -121,6 +151,25 @@ class ProductToSale(Base):
     product = relationship("Product", back_populates="product_sales")
 
 
+class SaleMarginRollup(Base):
+    """Дневной агрегат продаж: выручка и себестоимость по товару и сотруднику"""
+    __tablename__ = "SaleMarginRollup"
+
+    id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    day = Column(Date, nullable=False)
+    productId = Column(String, ForeignKey("Product.id", ondelete="CASCADE"), nullable=False)
+    categoryId = Column(String, ForeignKey("ProductCategory.id", ondelete="CASCADE"), nullable=False)
+    employeeId = Column(String, ForeignKey("Employee.id", ondelete="CASCADE"), nullable=False)
+    unitsSold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    cost = Column(Float, nullable=False, default=0)  # Себестоимость проданного по средней на момент продажи
+
+    __table_args__ = (
+        UniqueConstraint("day", "productId", "employeeId", name="uq_SaleMarginRollup_day_product_employee"),
+        Index("ix_SaleMarginRollup_day", "day"),
+    )
+
+
 class Supplier(Base):
     __tablename__ = "Supplier"
 
@@ -129,18 +178,59 @@ class Supplier(Base):
     contacts = Column(String, nullable=False)
 
     orders = relationship("OrderToSupplier", back_populates="supplier")
+    purchase_orders = relationship("PurchaseOrder", back_populates="supplier")
+
+
+class PurchaseOrder(Base):
+    """Шапка заказа поставщику с предрассчитанными итогами"""
+    __tablename__ = "PurchaseOrder"
+
+    id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    supplierId = Column(String, ForeignKey("Supplier.id", ondelete="CASCADE"), nullable=False)
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    totalCount = Column(Integer, nullable=False, default=0)  # Всего единиц товара
+    totalAmount = Column(Float, nullable=False, default=0)  # Сумма закупки
+    linesCount = Column(Integer, nullable=False, default=0)
+
+    supplier = relationship("Supplier", back_populates="purchase_orders")
+    lines = relationship("OrderToSupplier", back_populates="purchase_order")
+
+    __table_args__ = (
+        Index("ix_PurchaseOrder_createdAt_id", "createdAt", "id"),
+        Index("ix_PurchaseOrder_supplierId_createdAt", "supplierId", "createdAt"),
+    )
+
+
+class SupplierMonthlyRollup(Base):
+    """Месячный агрегат закупок у поставщика"""
+    __tablename__ = "SupplierMonthlyRollup"
+
+    id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    supplierId = Column(String, ForeignKey("Supplier.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False)  # Первое число месяца
+    ordersCount = Column(Integer, nullable=False, default=0)
+    linesCount = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    spend = Column(Float, nullable=False, default=0)  # Сумма закупки
+
+    __table_args__ = (
+        UniqueConstraint("supplierId", "month", name="uq_SupplierMonthlyRollup_supplier_month"),
+        Index("ix_SupplierMonthlyRollup_month", "month"),
+    )
 
 
 class OrderToSupplier(Base):
     __tablename__ = "OrderToSupplier"
 
     id = Column(String, primary_key=True, default=generate_uuid, unique=True)
+    purchaseOrderId = Column(String, ForeignKey("PurchaseOrder.id", ondelete="CASCADE"), nullable=False, index=True)
     supplierId = Column(String, ForeignKey("Supplier.id", ondelete="CASCADE"), nullable=False)
     ProductId = Column(String, ForeignKey("Product.id", ondelete="CASCADE"), nullable=False)
     count = Column(Integer, nullable=False)
     purchasePrice = Column(Float, nullable=False)  # Цена закупки за штуку
     createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    purchase_order = relationship("PurchaseOrder", back_populates="lines")
     supplier = relationship("Supplier", back_populates="orders")
     product = relationship("Product", back_populates="orders_to_supplier")
 
@@ -151,6 +241,8 @@ class Discount(Base):
     id = Column(String, primary_key=True, default=generate_uuid, unique=True)
     name = Column(String, nullable=False)
     percentage = Column(Float, nullable=False)
+    startsAt = Column(DateTime, nullable=True)  # None - действует с момента создания
+    endsAt = Column(DateTime, nullable=True)  # None - бессрочно
 
     category_discounts = relationship("CategoryToDiscount", back_populates="discount", cascade="all, delete-orphan")
     color_discounts = relationship("ColorToDiscount", back_populates="discount", cascade="all, delete-orphan")
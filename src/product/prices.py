@@ -0,0 +1,123 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, insert, values, column, String, Float, literal, func, cast
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Product, ProductPriceHistory, generate_uuid
+
+
+class PriceHistoryService:
+    """
+    История цен товаров и выборка цены на момент времени
+
+    Запись добавляется только когда цена действительно меняется, поэтому
+    таблица остаётся компактной, а цена на момент T - это последняя
+    запись с validFrom <= T (индекс productId, validFrom).
+    """
+
+    @staticmethod
+    def record_initial_price(db: AsyncSession, product: Product, valid_from: Optional[datetime] = None) -> None:
+        """Добавить в сессию первую запись истории для нового товара"""
+        db.add(ProductPriceHistory(
+            id=generate_uuid(),
+            productId=product.id,
+            price=product.price,
+            validFrom=valid_from or datetime.utcnow()
+        ))
+
+    @staticmethod
+    async def record_prices(db: AsyncSession, prices: Dict[str, float], valid_from: Optional[datetime] = None) -> None:
+        """
+        Записать новые цены товаров в историю одним запросом
+
+        Вызывается до обновления Product.price: в историю попадают только
+        товары, у которых новая цена отличается от текущей.
+
+        Args:
+            db: сессия базы данных
+            prices: новые цены {productId: цена}
+            valid_from: момент, с которого действуют цены (по умолчанию сейчас)
+        """
+        if not prices:
+            return
+
+        new_prices = values(
+            column('product_id', String),
+            column('price', Float),
+            name='new_prices'
+        ).data(list(prices.items()))
+
+        stmt = insert(ProductPriceHistory).from_select(
+            ['id', 'productId', 'price', 'validFrom'],
+            select(
+                cast(func.gen_random_uuid(), String),
+                new_prices.c.product_id,
+                new_prices.c.price,
+                literal(valid_from or datetime.utcnow())
+            )
+            .join(Product, Product.id == new_prices.c.product_id)
+            .where(Product.price != new_prices.c.price)
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def get_history(db: AsyncSession, product_id: str, limit: int = 100) -> List[ProductPriceHistory]:
+        """Получить историю цены товара, новые записи первыми"""
+        result = await db.execute(
+            select(ProductPriceHistory)
+            .where(ProductPriceHistory.productId == product_id)
+            .order_by(ProductPriceHistory.validFrom.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_price_at(db: AsyncSession, product_id: str, at: datetime) -> Optional[float]:
+        """Получить цену товара на момент времени (None - товара тогда не было)"""
+        result = await db.execute(
+            select(ProductPriceHistory.price)
+            .where(ProductPriceHistory.productId == product_id, ProductPriceHistory.validFrom <= at)
+            .order_by(ProductPriceHistory.validFrom.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def price_at_lateral(product_id, at, name: str = 'price_at'):
+        """
+        LATERAL-подзапрос цены товара на момент времени для больших выборок
+
+        product_id и at - колонки внешнего запроса (например, позиция и время
+        чека): на каждую строку одно чтение индекса (productId, validFrom).
+        Присоединять через join(..., literal(True)) или outerjoin - если
+        у товара может не быть истории на этот момент.
+        """
+        return (
+            select(ProductPriceHistory.price)
+            .where(ProductPriceHistory.productId == product_id, ProductPriceHistory.validFrom <= at)
+            .order_by(ProductPriceHistory.validFrom.desc())
+            .limit(1)
+            .lateral(name)
+        )
+
+    @staticmethod
+    async def get_prices_at(db: AsyncSession, product_ids: Iterable[str], at: datetime) -> Dict[str, float]:
+        """
+        Получить цены многих товаров на момент времени одним запросом
+
+        Для каждого ID выполняется LATERAL-подзапрос с LIMIT 1 по индексу
+        (productId, validFrom), поэтому стоимость не зависит от длины истории.
+
+        Returns:
+            {productId: цена}, товары без истории на момент at отсутствуют
+        """
+        product_ids = list(set(product_ids))
+        if not product_ids:
+            return {}
+
+        ids = func.unnest(cast(product_ids, ARRAY(String))).table_valued('product_id').render_derived(name='ids')
+        price_at = PriceHistoryService.price_at_lateral(ids.c.product_id, at)
+        result = await db.execute(select(ids.c.product_id, price_at.c.price).join(price_at, literal(True)))
+        return dict(result.all())
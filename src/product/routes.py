@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Query, status, Depends
+from fastapi import APIRouter, HTTPException, Query, status, Depends
 from typing import List, Optional
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.product.schemas import (
@@ -14,10 +15,16 @@ from src.product.schemas import (
     CreateColorDto,
     ColorResponse,
     CreateSizeDto,
-    SizeResponse
+    SizeResponse,
+    PriceHistoryResponse,
+    PricesAsOfDto,
+    PricesAsOfResponse
 )
 from src.product.service import ProductService
+from src.product.prices import PriceHistoryService
+from src.auth.tokens import get_optional_employee, CurrentEmployee
 from src.database import get_db
+from src.config import settings
 
 router = APIRouter()
 
@@ -72,17 +79,58 @@ async def get_filter_options(db: AsyncSession = Depends(get_db)):
 async def create_sale(
     sale_dto: CreateSaleDto,
     db: AsyncSession = Depends(get_db),
-    employee_id: str = Query(..., description="ID сотрудника")
+    employee_id: Optional[str] = Query(None, description="ID сотрудника (если не передан токен)"),
+    current: Optional[CurrentEmployee] = Depends(get_optional_employee)
 ):
     """
     Создать продажу
 
-    Списывает товары со склада и создает запись о продаже
-    """
+    Списывает товары со склада и создает запись о продаже.
+    Продавец определяется по токену. employee_id без токена принимается только
+    при AUTH_ALLOW_EMPLOYEE_ID_PARAM (старые клиенты).
+    """
+    if current is not None:
+        if employee_id and employee_id != current.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="employee_id не совпадает с сотрудником из токена"
+            )
+        employee_id = current.id
+    elif not employee_id or not settings.AUTH_ALLOW_EMPLOYEE_ID_PARAM:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Требуется авторизация",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
     sale = await ProductService.create_sale(db, sale_dto, employee_id)
     return sale
 
 
+@router.post("/prices/as-of", response_model=PricesAsOfResponse)
+async def get_prices_as_of(dto: PricesAsOfDto, db: AsyncSession = Depends(get_db)):
+    """
+    Получить цены товаров на момент времени
+
+    Выбираются одним индексным запросом для всех переданных товаров
+    """
+    at = dto.at or datetime.utcnow()
+    prices = await PriceHistoryService.get_prices_at(db, dto.productIds, at)
+    return PricesAsOfResponse(at=at, prices=prices)
+
+
+@router.get("/{product_id}/price-history", response_model=List[PriceHistoryResponse])
+async def get_price_history(
+    product_id: str,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000, description="Лимит")
+):
+    """
+    Получить историю цены товара (новые записи первыми)
+    """
+    return await PriceHistoryService.get_history(db, product_id, limit)
+
+
 @router.delete("/{product_id}", response_model=ProductResponse)
 async def delete_product(product_id: str, db: AsyncSession = Depends(get_db)):
     """
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -99,3 +99,21 @@ class SizeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class PriceHistoryResponse(BaseModel):
+    price: float
+    validFrom: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PricesAsOfDto(BaseModel):
+    productIds: List[str] = Field(..., min_length=1, max_length=10000, description="ID товаров")
+    at: Optional[datetime] = Field(default=None, description="Момент времени (по умолчанию сейчас)")
+
+
+class PricesAsOfResponse(BaseModel):
+    at: datetime
+    prices: Dict[str, float]  # Товары без цены на этот момент отсутствуют
@@ -1,71 +1,40 @@
 from fastapi import HTTPException, status
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from src.models import (
     Product, ProductCategory, ProductColor, ProductSize, ShopRest,
-    Sale, ProductToSale, Season, Discount, CategoryToDiscount,
-    ColorToDiscount, SeasonToDiscount, SizeToDiscount
+    Sale, ProductToSale, Season
 )
 from src.product.schemas import (
     CreateProductDto, UpdateProductDto, CreateSaleDto,
     CreateCategoryDto, CreateColorDto
 )
+from src.product.prices import PriceHistoryService
+from src.discount.timeline import discount_timeline
+from src.reports.ledger import CostLedger
+from src.reports.live import live_top_products
+from src.events.hub import event_hub
+from src.supplier.reorder import reorder_cache
+from src.metrics import SALES_CREATED, UNITS_SOLD, SALES_REVENUE
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class ProductService:
     @staticmethod
     async def calculate_product_discount(db: AsyncSession, product: Product) -> float:
-        """Рассчитать общую скидку для продукта (сумма всех применимых скидок)"""
-        total_discount = 0.0
-
-        # Получаем все скидки
-        discounts_result = await db.execute(
-            select(Discount).options(
-                selectinload(Discount.category_discounts),
-                selectinload(Discount.color_discounts),
-                selectinload(Discount.season_discounts),
-                selectinload(Discount.size_discounts)
-            )
-        )
-        discounts = discounts_result.scalars().all()
-
-        for discount in discounts:
-            # Проверяем, применима ли скидка к продукту
-            applies = True
-
-            # Если у скидки есть категории, проверяем соответствие
-            if discount.category_discounts:
-                category_ids = [cd.categoryId for cd in discount.category_discounts]
-                if product.categoryId not in category_ids:
-                    applies = False
-
-            # Если у скидки есть цвета, проверяем соответствие
-            if applies and discount.color_discounts:
-                color_ids = [cd.colorId for cd in discount.color_discounts]
-                if product.colorId not in color_ids:
-                    applies = False
-
-            # Если у скидки есть сезоны, проверяем соответствие
-            if applies and discount.season_discounts:
-                seasons = [sd.season for sd in discount.season_discounts]
-                if product.season not in seasons:
-                    applies = False
-
-            # Если у скидки есть размеры, проверяем соответствие
-            if applies and discount.size_discounts:
-                size_ids = [sd.sizeId for sd in discount.size_discounts]
-                if product.sizeId not in size_ids:
-                    applies = False
-
-            # Если скидка применима, добавляем процент
-            if applies:
-                total_discount += discount.percentage
-
-        # Ограничиваем скидку до 100%
-        return min(total_discount, 100.0)
+        """
+        Рассчитать общую скидку для продукта (сумма всех действующих сейчас скидок)
+
+        Действующие скидки берутся из предрассчитанной шкалы discount_timeline,
+        БД читается только после создания или удаления скидки.
+        """
+        await discount_timeline.load(db)
+        return discount_timeline.product_discount(product)
 
     @staticmethod
     async def create_product(db: AsyncSession, create_dto: CreateProductDto):
@@ -80,6 +49,8 @@ class ProductService:
         )
 
         db.add(product)
+        await db.flush()
+        PriceHistoryService.record_initial_price(db, product)
         await db.commit()
         await db.refresh(product)
 
@@ -193,14 +164,18 @@ class ProductService:
     @staticmethod
     async def create_sale(db: AsyncSession, sale_dto: CreateSaleDto, employee_id: str):
         """Создать продажу и списать товары"""
-        print(f"[CREATE_SALE] Начало создания продажи для сотрудника {employee_id}")
-        print(f"[CREATE_SALE] Количество товаров: {len(sale_dto.items)}")
+        logger.info("Создание продажи: сотрудник %s, позиций %d", employee_id, len(sale_dto.items))
 
         total_price = 0.0
+        sale_lines = []
+        rest_counts = {}
+        # Строки остатков и агрегатов блокируются в порядке товаров: одинаковый
+        # порядок во всех транзакциях исключает взаимные блокировки продаж
+        items = sorted(sale_dto.items, key=lambda item: item.productId)
 
         # Проверяем наличие товаров и считаем итоговую цену
-        for item in sale_dto.items:
-            print(f"[CREATE_SALE] Проверка товара {item.productId}, количество: {item.count}")
+        for item in items:
+            logger.debug("Проверка товара %s, количество: %d", item.productId, item.count)
             # Получаем продукт с остатками
             product_result = await db.execute(
                 select(Product).options(selectinload(Product.shop_rest))
@@ -209,30 +184,34 @@ class ProductService:
             product = product_result.scalar_one_or_none()
 
             if not product:
-                print(f"[CREATE_SALE] Ошибка: продукт {item.productId} не найден")
+                logger.warning("Продажа отклонена: продукт %s не найден", item.productId)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Продукт {item.productId} не найден"
                 )
 
             if not product.shop_rest:
-                print(f"[CREATE_SALE] Ошибка: товар '{product.name}' отсутствует на складе")
+                logger.warning("Продажа отклонена: товар %s отсутствует на складе", product.id)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Товар '{product.name}' отсутствует на складе"
                 )
 
             if product.shop_rest.restCount < item.count:
-                print(f"[CREATE_SALE] Ошибка: недостаточно товара '{product.name}'. Доступно: {product.shop_rest.restCount}, запрошено: {item.count}")
+                logger.warning(
+                    "Продажа отклонена: недостаточно товара %s, доступно %d, запрошено %d",
+                    product.id, product.shop_rest.restCount, item.count
+                )
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Недостаточно товара '{product.name}'. Доступно: {product.shop_rest.restCount}"
                 )
 
             total_price += product.price * item.count
-            print(f"[CREATE_SALE] Товар '{product.name}' проверен, цена: {product.price}, количество: {item.count}")
+            sale_lines.append((product, item.count, product.price * item.count))
+            logger.debug("Товар %s проверен, цена: %s, количество: %d", product.id, product.price, item.count)
 
-        print(f"[CREATE_SALE] Итоговая цена: {total_price}")
+        logger.debug("Итоговая цена продажи: %s", total_price)
 
         # Создаем продажу
         try:
@@ -243,13 +222,13 @@ class ProductService:
             )
             db.add(sale)
             await db.flush()
-            print(f"[CREATE_SALE] Продажа создана с ID: {sale.id}")
-        except Exception as e:
-            print(f"[CREATE_SALE] Ошибка при создании продажи: {e}")
+            logger.debug("Продажа создана с ID: %s", sale.id)
+        except Exception:
+            logger.exception("Ошибка при создании продажи")
             raise
 
         # Создаем связи и списываем товары
-        for item in sale_dto.items:
+        for item in items:
             try:
                 # Создаем связь ProductToSale
                 product_to_sale = ProductToSale(
@@ -258,36 +237,77 @@ class ProductService:
                     count=item.count
                 )
                 db.add(product_to_sale)
-                print(f"[CREATE_SALE] Создана связь ProductToSale для товара {item.productId}")
-
-                # Списываем товар
-                product_result = await db.execute(
-                    select(Product).options(selectinload(Product.shop_rest))
-                    .where(Product.id == item.productId)
+                logger.debug("Создана связь ProductToSale для товара %s", item.productId)
+
+                # Списываем товар одним UPDATE относительно текущего значения: остаток
+                # мог измениться после проверки выше (поставка или другая продажа),
+                # поэтому условие restCount >= count проверяется под блокировкой строки
+                rest_result = await db.execute(
+                    update(ShopRest)
+                    .where(ShopRest.productId == item.productId, ShopRest.restCount >= item.count)
+                    .values(restCount=ShopRest.restCount - item.count)
+                    .returning(ShopRest.restCount)
+                    .execution_options(synchronize_session=False)
                 )
-                product = product_result.scalar_one()
-                product.shop_rest.restCount -= item.count
-                print(f"[CREATE_SALE] Списано {item.count} единиц товара '{product.name}', осталось: {product.shop_rest.restCount}")
-            except Exception as e:
-                print(f"[CREATE_SALE] Ошибка при обработке товара {item.productId}: {e}")
+                rest_count = rest_result.scalar_one_or_none()
+                if rest_count is None:
+                    logger.warning("Продажа отклонена: товар %s раскуплен параллельной продажей", item.productId)
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Недостаточно товара {item.productId}"
+                    )
+                rest_counts[item.productId] = rest_count
+                logger.debug("Списано %d ед. товара %s, осталось: %d", item.count, item.productId, rest_count)
+            except HTTPException:
                 raise
+            except Exception:
+                logger.exception("Ошибка при обработке товара %s", item.productId)
+                raise
+
+        # Обновляем агрегаты маржи по себестоимости
+        await CostLedger.record_sale(db, sale, sale_lines)
 
         try:
             await db.commit()
             await db.refresh(sale)
-            print(f"[CREATE_SALE] Продажа успешно создана и сохранена")
-        except Exception as e:
-            print(f"[CREATE_SALE] Ошибка при коммите: {e}")
+            logger.info("Продажа %s сохранена, сумма %s", sale.id, total_price)
+        except Exception:
+            logger.exception("Ошибка при сохранении продажи")
             raise
 
+        reorder_cache.invalidate()
+        SALES_CREATED.inc()
+        UNITS_SOLD.inc(sum(count for _, count, _ in sale_lines))
+        SALES_REVENUE.inc(total_price)
+
+        # Оперативный топ продаж учитываем только после успешного коммита
+        for product, count, _ in sale_lines:
+            live_top_products.record(product.id, product.name, count)
+
+        # Рассылаем подписчикам изменения для отчетов и остатков
+        event_hub.publish("sale", {
+            "saleId": sale.id,
+            "employeeId": sale.employeeId,
+            "finalPrice": sale.finalPrice,
+            "createdAt": sale.createdAt.isoformat(),
+            "items": [
+                {"productId": product.id, "count": count, "revenue": revenue}
+                for product, count, revenue in sale_lines
+            ]
+        })
+        event_hub.publish("stock", {
+            "items": [
+                {"productId": product_id, "restCount": rest_count}
+                for product_id, rest_count in rest_counts.items()
+            ]
+        })
+
         return sale
 
     @staticmethod
     async def update_product(db: AsyncSession, product_id: str, update_dto: UpdateProductDto):
         """Обновить продукт"""
         try:
-            print(f"[PRODUCT_SERVICE] Updating product {product_id} with data: {update_dto.model_dump(exclude_unset=True)}")
-
             result = await db.execute(
                 select(Product).where(Product.id == product_id)
             )
@@ -300,37 +320,37 @@ class ProductService:
                 )
 
             update_data = update_dto.model_dump(exclude_unset=True)
-            print(f"[PRODUCT_SERVICE] Update data: {update_data}")
+            logger.info("Обновление продукта %s: %s", product_id, update_data)
 
             # Конвертируем season в enum если он есть
             if "season" in update_data and update_data["season"]:
                 try:
                     update_data["season"] = Season[update_data["season"]]
-                    print(f"[PRODUCT_SERVICE] Season converted to enum: {update_data['season']}")
-                except KeyError as e:
-                    print(f"[PRODUCT_SERVICE] ERROR: Invalid season value: {update_data['season']}")
+                except KeyError:
+                    logger.warning("Недопустимое значение сезона: %s", update_data["season"])
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail=f"Недопустимое значение сезона: {update_data['season']}"
                     )
 
+            # Историю пишем до изменения цены: сравнивается с текущей
+            if update_data.get("price") is not None:
+                await PriceHistoryService.record_prices(db, {product.id: update_data["price"]})
+
             for key, value in update_data.items():
-                print(f"[PRODUCT_SERVICE] Setting {key} = {value}")
                 setattr(product, key, value)
 
             await db.commit()
             await db.refresh(product)
 
-            print(f"[PRODUCT_SERVICE] Product updated successfully: {product.id}")
+            logger.debug("Продукт %s обновлен", product.id)
             return product
 
         except HTTPException:
             raise
         except Exception as e:
             await db.rollback()
-            print(f"[PRODUCT_SERVICE] ERROR updating product: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при обновлении продукта %s", product_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Ошибка при обновлении продукта: {str(e)}"
@@ -357,9 +377,7 @@ class ProductService:
             return product
         except Exception as e:
             await db.rollback()
-            print(f"[PRODUCT_SERVICE] Ошибка удаления продукта: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка удаления продукта %s", product_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Ошибка при удалении продукта: {str(e)}"
@@ -0,0 +1,320 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+
+# Колонки факта продаж: одна строка на позицию чека
+FACT_COLUMNS = {
+    "sale_ts": np.int64,     # Время продажи, секунды UTC
+    "product": np.int32,     # Код товара в словаре product
+    "employee": np.int32,    # Код сотрудника в словаре employee
+    "category": np.int32,    # Код категории в словаре category
+    "units": np.int32,       # Количество
+    "revenue": np.float64    # Выручка по позиции
+}
+DIMENSIONS = ("product", "employee", "category")
+METRICS = ("units", "revenue")
+
+MANIFEST_FILE = "manifest.json"
+DICTIONARIES_FILE = "dictionaries.json"
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    """Записать JSON через временный файл, чтобы читатели не видели половину"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _to_epoch(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class SalesFactWriter:
+    """
+    Запись снимка фактов продаж в колоночном виде
+
+    Каждая выгрузка добавляет новые части (part-NNNNNN) с .npy-файлами
+    колонок, словари ключей только дополняются, поэтому коды в старых
+    частях остаются валидными.
+
+    Продажа с ранним createdAt может закоммититься позже продаж за водяным
+    знаком, поэтому выгрузка перечитывает окно overlap перед ним. Чтобы
+    повтор был идемпотентным, манифест хранит ID продаж из этого окна
+    (recentSales), уже выгруженные продажи пропускаются.
+    """
+
+    def __init__(self, root: str, overlap: timedelta = timedelta(0)):
+        self.root = root
+        self.overlap = overlap
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._load(MANIFEST_FILE, {"watermark": None, "parts": [], "rows": 0, "recentSales": {}})
+        self.dictionaries = self._load(
+            DICTIONARIES_FILE,
+            {dim: {"ids": [], "names": []} for dim in DIMENSIONS}
+        )
+        self._codes = {
+            dim: {key: code for code, key in enumerate(self.dictionaries[dim]["ids"])}
+            for dim in DIMENSIONS
+        }
+
+    def _load(self, name: str, default: dict) -> dict:
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        """Время последней выгруженной продажи"""
+        value = self.manifest["watermark"]
+        return datetime.fromisoformat(value) if value else None
+
+    @property
+    def export_since(self) -> Optional[datetime]:
+        """
+        С какого createdAt (не включительно) перечитывать продажи
+
+        Снимок старого формата без recentSales выгружен ровно до водяного
+        знака: перечитывать окно без списка выгруженных продаж нельзя.
+        """
+        watermark = self.watermark
+        if watermark is None or "recentSales" not in self.manifest:
+            return watermark
+        return watermark - self.overlap
+
+    @property
+    def recent_sale_ids(self) -> Set[str]:
+        """ID продаж из окна перед водяным знаком, уже записанных в снимок"""
+        return set(self.manifest.get("recentSales", {}))
+
+    def encode(self, dimension: str, key: str, name: str) -> int:
+        """Получить код ключа в словаре, добавив его при необходимости"""
+        codes = self._codes[dimension]
+        code = codes.get(key)
+        if code is None:
+            code = len(codes)
+            codes[key] = code
+            self.dictionaries[dimension]["ids"].append(key)
+            self.dictionaries[dimension]["names"].append(name)
+        return code
+
+    def append_part(self, columns: Dict[str, List], sales: Dict[str, datetime]) -> int:
+        """
+        Записать очередную часть и сдвинуть водяной знак
+
+        Args:
+            columns: значения колонок FACT_COLUMNS одинаковой длины
+            sales: продажи части целиком {ID продажи: createdAt}
+
+        Returns:
+            Количество записанных строк
+        """
+        rows = len(columns["sale_ts"])
+        if not rows:
+            return 0
+
+        part_name = f"part-{len(self.manifest['parts']) + 1:06d}"
+        part_dir = os.path.join(self.root, part_name)
+        tmp_dir = f"{part_dir}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for column, dtype in FACT_COLUMNS.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), np.asarray(columns[column], dtype=dtype))
+        os.replace(tmp_dir, part_dir)
+
+        # Продажи из окна перекрытия старше водяного знака: он не сдвигается назад
+        watermark = max(filter(None, [self.watermark, *sales.values()]))
+        keep_after = watermark - self.overlap
+        recent = {
+            sale_id: created_at
+            for sale_id, created_at in self.manifest.get("recentSales", {}).items()
+            if datetime.fromisoformat(created_at) > keep_after
+        }
+        recent.update(
+            (sale_id, created_at.isoformat())
+            for sale_id, created_at in sales.items()
+            if created_at > keep_after
+        )
+
+        # Сначала словари, затем манифест: часть становится видимой последней
+        _write_json_atomic(os.path.join(self.root, DICTIONARIES_FILE), self.dictionaries)
+        self.manifest["parts"].append({"name": part_name, "rows": rows})
+        self.manifest["rows"] += rows
+        self.manifest["watermark"] = watermark.isoformat()
+        self.manifest["recentSales"] = recent
+        _write_json_atomic(os.path.join(self.root, MANIFEST_FILE), self.manifest)
+        return rows
+
+
+class SalesFactStore:
+    """
+    Аналитические запросы к снимку фактов продаж без обращения к Postgres
+
+    Колонки открываются через memory-map, агрегаты считаются по частям
+    векторно (bincount), поэтому в память целиком снимок не загружается.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(root, DICTIONARIES_FILE), encoding="utf-8") as f:
+            self.dictionaries = json.load(f)
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+    def _parts(self, columns) -> Iterator[Dict[str, np.ndarray]]:
+        for part in self.manifest["parts"]:
+            part_dir = os.path.join(self.root, part["name"])
+            yield {
+                column: np.load(os.path.join(part_dir, f"{column}.npy"), mmap_mode="r")
+                for column in columns
+            }
+
+    def _filtered_parts(
+        self,
+        columns,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Части с применёнными фильтрами по времени и измерениям"""
+        start, end = _to_epoch(date_from), _to_epoch(date_to)
+        filter_codes = {}
+        for dimension, key in (filters or {}).items():
+            ids = self.dictionaries[dimension]["ids"]
+            if key not in ids:
+                return
+            filter_codes[dimension] = ids.index(key)
+
+        needed = set(columns) | set(filter_codes)
+        if start is not None or end is not None:
+            needed.add("sale_ts")
+
+        for part in self._parts(sorted(needed)):
+            mask = None
+            if start is not None:
+                mask = part["sale_ts"] >= start
+            if end is not None:
+                cond = part["sale_ts"] < end
+                mask = cond if mask is None else mask & cond
+            for dimension, code in filter_codes.items():
+                cond = part[dimension] == code
+                mask = cond if mask is None else mask & cond
+            if mask is None:
+                yield part
+            else:
+                yield {column: np.asarray(part[column])[mask] for column in columns}
+
+    def top(
+        self,
+        dimension: str = "product",
+        n: int = 10,
+        metric: str = "revenue",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[dict]:
+        """
+        Топ-N значений измерения по метрике
+
+        Args:
+            dimension: product, employee или category
+            n: количество строк
+            metric: units или revenue (сортировка)
+            date_from: начало периода включительно
+            date_to: конец периода не включительно
+            filters: фильтры по измерениям {измерение: id}
+
+        Returns:
+            Список {id, name, units, revenue}
+        """
+        size = len(self.dictionaries[dimension]["ids"])
+        units = np.zeros(size, dtype=np.int64)
+        revenue = np.zeros(size, dtype=np.float64)
+        for part in self._filtered_parts((dimension, "units", "revenue"), date_from, date_to, filters):
+            codes = part[dimension]
+            units += np.bincount(codes, weights=part["units"], minlength=size).astype(np.int64)
+            revenue += np.bincount(codes, weights=part["revenue"], minlength=size)
+
+        values = units if metric == "units" else revenue
+        n = min(n, size)
+        if n <= 0:
+            return []
+        # argpartition выбирает N лучших за O(size), сортируем только их
+        top_codes = np.argpartition(-values, n - 1)[:n]
+        top_codes = top_codes[np.argsort(-values[top_codes], kind="stable")]
+
+        ids = self.dictionaries[dimension]["ids"]
+        names = self.dictionaries[dimension]["names"]
+        return [
+            {
+                "id": ids[code],
+                "name": names[code],
+                "units": int(units[code]),
+                "revenue": round(float(revenue[code]), 2)
+            }
+            for code in top_codes
+            if units[code] or revenue[code]
+        ]
+
+    def time_series(
+        self,
+        freq: str = "day",
+        metric: str = "revenue",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[dict]:
+        """
+        Временной ряд метрики
+
+        Args:
+            freq: hour, day, week или month
+            metric: units или revenue
+            date_from: начало периода включительно
+            date_to: конец периода не включительно
+            filters: фильтры по измерениям {измерение: id}
+
+        Returns:
+            Список {period, value} по возрастанию периода
+        """
+        unit = {"hour": "h", "day": "D", "week": "W", "month": "M"}[freq]
+        totals: Dict[int, float] = {}
+        for part in self._filtered_parts(("sale_ts", metric), date_from, date_to, filters):
+            if not len(part["sale_ts"]):
+                continue
+            ts = np.asarray(part["sale_ts"])
+            if freq == "week":
+                # Недели с понедельника: 1970-01-01 был четвергом
+                buckets = (ts + 3 * 86400) // (7 * 86400)
+            else:
+                buckets = ts.astype("datetime64[s]").astype(f"datetime64[{unit}]").astype(np.int64)
+            keys, inverse = np.unique(buckets, return_inverse=True)
+            sums = np.bincount(inverse, weights=part[metric])
+            for key, value in zip(keys.tolist(), sums.tolist()):
+                totals[key] = totals.get(key, 0.0) + value
+
+        series = []
+        for key in sorted(totals):
+            if freq == "week":
+                period = np.datetime64(key * 7 - 3, "D")
+            else:
+                period = np.datetime64(key, unit)
+            value = totals[key]
+            series.append({
+                "period": str(period),
+                "value": int(value) if metric == "units" else round(value, 2)
+            })
+        return series
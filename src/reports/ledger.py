@@ -0,0 +1,177 @@
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import select, update, case, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import (
+    ProductCost, SaleMarginRollup, SupplierMonthlyRollup, PurchaseOrder, Product, Sale, generate_uuid
+)
+
+
+class CostLedger:
+    """
+    Инкрементальный учёт себестоимости
+
+    Средняя цена закупки пересчитывается при каждом поступлении,
+    закупки складываются в месячные агрегаты SupplierMonthlyRollup,
+    а продажи - в дневные агрегаты SaleMarginRollup, поэтому отчёты
+    по марже и поставщикам не перебирают историю закупок и продаж.
+    """
+
+    @staticmethod
+    async def record_purchases(db: AsyncSession, lines: Iterable[Tuple[str, int, float]]) -> None:
+        """
+        Учесть поступление товаров
+
+        Args:
+            db: сессия базы данных
+            lines: строки (productId, количество, цена закупки за штуку)
+        """
+        # Схлопываем повторы одного товара: ON CONFLICT не может обновить строку дважды
+        totals = {}
+        for product_id, count, unit_cost in lines:
+            prev_count, prev_amount = totals.get(product_id, (0, 0.0))
+            totals[product_id] = (prev_count + count, prev_amount + count * unit_cost)
+
+        if not totals:
+            return
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": generate_uuid(),
+                "productId": product_id,
+                "stockCount": count,
+                "avgCost": amount / count if count else 0.0,
+                "updatedAt": now
+            }
+            # По порядку товаров, как и остальные блокирующие записи (см. record_sale)
+            for product_id, (count, amount) in sorted(totals.items())
+        ]
+
+        stmt = insert(ProductCost).values(rows)
+        new_stock = ProductCost.stockCount + stmt.excluded.stockCount
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductCost.productId],
+            set_={
+                "avgCost": case(
+                    (
+                        new_stock > 0,
+                        (ProductCost.stockCount * ProductCost.avgCost
+                         + stmt.excluded.stockCount * stmt.excluded.avgCost) / new_stock
+                    ),
+                    else_=stmt.excluded.avgCost
+                ),
+                "stockCount": new_stock,
+                "updatedAt": stmt.excluded.updatedAt
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def record_supplier_delivery(
+        db: AsyncSession,
+        purchase_order: PurchaseOrder,
+        lines: List[Tuple[int, float]],
+        new_order: bool = True
+    ) -> None:
+        """
+        Учесть поставку в месячном агрегате поставщика
+
+        Args:
+            db: сессия базы данных
+            purchase_order: шапка заказа (нужны supplierId и createdAt)
+            lines: строки (количество, цена закупки за штуку)
+            new_order: первая пачка строк заказа - увеличить счётчик заказов
+        """
+        if not lines:
+            return
+
+        stmt = insert(SupplierMonthlyRollup).values(
+            id=generate_uuid(),
+            supplierId=purchase_order.supplierId,
+            month=purchase_order.createdAt.date().replace(day=1),
+            ordersCount=1 if new_order else 0,
+            linesCount=len(lines),
+            units=sum(count for count, _ in lines),
+            spend=sum(count * unit_cost for count, unit_cost in lines)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SupplierMonthlyRollup.supplierId, SupplierMonthlyRollup.month],
+            set_={
+                "ordersCount": SupplierMonthlyRollup.ordersCount + stmt.excluded.ordersCount,
+                "linesCount": SupplierMonthlyRollup.linesCount + stmt.excluded.linesCount,
+                "units": SupplierMonthlyRollup.units + stmt.excluded.units,
+                "spend": SupplierMonthlyRollup.spend + stmt.excluded.spend
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def record_sale(db: AsyncSession, sale: Sale, lines: List[Tuple[Product, int, float]]) -> None:
+        """
+        Учесть продажу в дневных агрегатах маржи
+
+        Args:
+            db: сессия базы данных
+            sale: созданная продажа (нужны employeeId и createdAt)
+            lines: строки (продукт, количество, выручка по строке)
+        """
+        if not lines:
+            return
+
+        product_ids = sorted({product.id for product, _, _ in lines})
+        # Блокируем строки себестоимости сразу и по порядку товаров: UPDATE ниже
+        # тогда не берет блокировки в порядке плана запроса, и параллельные
+        # продажи и поставки не блокируют друг друга взаимно
+        result = await db.execute(
+            select(ProductCost.productId, ProductCost.avgCost)
+            .where(ProductCost.productId.in_(product_ids))
+            .order_by(ProductCost.productId)
+            .with_for_update()
+        )
+        avg_costs = dict(result.all())
+
+        day = sale.createdAt.date()
+        rollups = {}
+        for product, count, revenue in lines:
+            row = rollups.setdefault(product.id, {
+                "id": generate_uuid(),
+                "day": day,
+                "productId": product.id,
+                "categoryId": product.categoryId,
+                "employeeId": sale.employeeId,
+                "unitsSold": 0,
+                "revenue": 0.0,
+                "cost": 0.0
+            })
+            row["unitsSold"] += count
+            row["revenue"] += revenue
+            row["cost"] += count * avg_costs.get(product.id, 0.0)
+
+        stmt = insert(SaleMarginRollup).values([rollups[product_id] for product_id in sorted(rollups)])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SaleMarginRollup.day, SaleMarginRollup.productId, SaleMarginRollup.employeeId],
+            set_={
+                "unitsSold": SaleMarginRollup.unitsSold + stmt.excluded.unitsSold,
+                "revenue": SaleMarginRollup.revenue + stmt.excluded.revenue,
+                "cost": SaleMarginRollup.cost + stmt.excluded.cost
+            }
+        )
+        await db.execute(stmt)
+
+        # Списываем проданное из учётного остатка одним запросом
+        sold = {product_id: row["unitsSold"] for product_id, row in rollups.items()}
+        await db.execute(
+            update(ProductCost)
+            .where(ProductCost.productId.in_(product_ids))
+            .values(
+                stockCount=func.greatest(
+                    ProductCost.stockCount - case(sold, value=ProductCost.productId, else_=0),
+                    0
+                ),
+                updatedAt=datetime.utcnow()
+            )
+        )
@@ -0,0 +1,114 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Приближённый топ-k по алгоритму Space-Saving
+
+    Хранит не более capacity счётчиков. Когда место кончается, самый
+    редкий ключ вытесняется, а новый наследует его счёт как погрешность,
+    поэтому настоящие лидеры потока не теряются.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # key -> [счёт, погрешность, подпись]
+        self.counters: Dict[str, list] = {}
+        # Ленивая куча минимумов: записи могут отставать от counters и поправляются при вытеснении
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, key: str, label: str, weight: int = 1) -> None:
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0, label]
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        # Находим действительный минимум, обновляя устаревшие записи кучи
+        while True:
+            count, min_key = self._heap[0]
+            actual = self.counters[min_key][0]
+            if actual == count:
+                break
+            heapq.heapreplace(self._heap, (actual, min_key))
+
+        del self.counters[min_key]
+        self.counters[key] = [count + weight, count, label]
+        heapq.heapreplace(self._heap, (count + weight, key))
+
+
+class LiveTopProducts:
+    """
+    Самые продаваемые товары за скользящее окно
+
+    Окно разбито на кольцо временных корзин, в каждой свой Space-Saving.
+    Запись продажи - O(1) амортизированно (O(log capacity) при вытеснении),
+    память ограничена buckets * capacity счётчиков и не растёт с потоком.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, buckets: int = 60, capacity: int = 200):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.capacity = capacity
+        # Слот кольца: (номер корзины от начала эпохи, счётчики)
+        self._ring: List[Optional[Tuple[int, SpaceSaving]]] = [None] * buckets
+
+    def _bucket(self, now: float) -> SpaceSaving:
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % self.buckets
+        entry = self._ring[slot]
+        if entry is None or entry[0] != epoch:
+            entry = (epoch, SpaceSaving(self.capacity))
+            self._ring[slot] = entry
+        return entry[1]
+
+    def record(self, product_id: str, name: str, count: int, now: Optional[float] = None) -> None:
+        """Учесть проданное количество товара"""
+        self._bucket(now if now is not None else time.time()).add(product_id, name, count)
+
+    def top(self, limit: int = 10, window_seconds: Optional[int] = None, now: Optional[float] = None) -> List[dict]:
+        """
+        Получить приближённый топ товаров за окно
+
+        Args:
+            limit: количество товаров
+            window_seconds: длина окна (не больше размера кольца)
+            now: текущее время, по умолчанию time.time()
+
+        Returns:
+            Список {id, name, units_sold, max_error}, units_sold - оценка сверху
+        """
+        now = now if now is not None else time.time()
+        current = int(now // self.bucket_seconds)
+        # Берём все корзины, пересекающиеся с окном, но не больше размера кольца
+        oldest = current - self.buckets + 1
+        if window_seconds is not None:
+            oldest = max(oldest, int((now - window_seconds) // self.bucket_seconds))
+
+        merged: Dict[str, list] = {}
+        for entry in self._ring:
+            if entry is None or not (oldest <= entry[0] <= current):
+                continue
+            for key, (count, error, label) in entry[1].counters.items():
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = [count, error, label]
+                else:
+                    total[0] += count
+                    total[1] += error
+
+        top = heapq.nlargest(limit, merged.items(), key=lambda item: item[1][0])
+        return [
+            {"id": key, "name": label, "units_sold": count, "max_error": error}
+            for key, (count, error, label) in top
+        ]
+
+
+# Общий для процесса экземпляр, пополняется из ProductService.create_sale
+live_top_products = LiveTopProducts()
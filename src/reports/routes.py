@@ -1,7 +1,13 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
 
-from src.reports.schemas import ReportsResponse
+from src.reports.schemas import (
+    ReportsResponse, MarginReportResponse, InventoryReportResponse, LiveReportResponse, LiveTopProductResponse,
+    SupplierReportResponse
+)
+from src.reports.live import live_top_products
 from src.reports.service import ReportsService
 from src.database import get_db
 
@@ -29,3 +35,72 @@ async def get_reports(
         top_products=top_products
     )
 
+
+@router.get("/margin", response_model=MarginReportResponse)
+async def get_margin_report(
+    db: AsyncSession = Depends(get_db),
+    group_by: str = Query("product", pattern="^(product|category|employee|period)$", description="Группировка"),
+    period: str = Query("day", pattern="^(day|week|month)$", description="Шаг периода для group_by=period"),
+    date_from: Optional[date] = Query(None, description="Начало периода"),
+    date_to: Optional[date] = Query(None, description="Конец периода"),
+    limit: int = Query(100, ge=1, le=1000, description="Лимит")
+):
+    """
+    Получить отчет по валовой марже
+
+    Выручка и себестоимость (по средней цене закупки) в разрезе товаров,
+    категорий, сотрудников или периодов
+    """
+    return await ReportsService.get_margin_report(db, group_by, period, date_from, date_to, limit)
+
+
+@router.get("/inventory", response_model=InventoryReportResponse)
+async def get_inventory_report(
+    db: AsyncSession = Depends(get_db),
+    window_days: int = Query(30, ge=1, le=365, description="Окно расчета скорости продаж, дней"),
+    sort_by: str = Query("days_of_stock", pattern="^(days_of_stock|velocity|turnover)$", description="Сортировка"),
+    offset: int = Query(0, ge=0, description="Смещение"),
+    limit: int = Query(100, ge=1, le=1000, description="Лимит")
+):
+    """
+    Получить отчет по запасам
+
+    Для каждого товара: остаток, средние продажи в день, на сколько дней
+    хватит запаса и коэффициент оборачиваемости за окно
+    """
+    return await ReportsService.get_inventory_report(db, window_days, sort_by, offset, limit)
+
+
+@router.get("/suppliers", response_model=SupplierReportResponse)
+async def get_supplier_report(
+    db: AsyncSession = Depends(get_db),
+    supplier_id: Optional[str] = Query(None, description="ID поставщика"),
+    date_from: Optional[date] = Query(None, description="Начало периода"),
+    date_to: Optional[date] = Query(None, description="Конец периода"),
+    limit: int = Query(20, ge=1, le=500, description="Количество поставщиков")
+):
+    """
+    Получить отчет по закупкам у поставщиков
+
+    Сумма закупок, количество товара, средняя цена закупки и частота
+    заказов по каждому поставщику с разбивкой по месяцам
+    """
+    return await ReportsService.get_supplier_report(db, supplier_id, date_from, date_to, limit)
+
+
+@router.get("/live", response_model=LiveReportResponse)
+async def get_live_report(
+    window_minutes: int = Query(60, ge=1, le=60, description="Окно в минутах"),
+    limit: int = Query(10, ge=1, le=50, description="Количество товаров")
+):
+    """
+    Оперативный топ продаваемых товаров за последние минуты
+
+    Считается в памяти процесса по потоку продаж, без запросов к БД.
+    Значения приближенные: units_sold - оценка сверху с погрешностью не больше max_error
+    """
+    top = live_top_products.top(limit, window_minutes * 60)
+    return LiveReportResponse(
+        window_minutes=window_minutes,
+        top_products=[LiveTopProductResponse(**item) for item in top]
+    )
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 
 class TopEmployeeResponse(BaseModel):
@@ -39,3 +40,85 @@ class ReportsResponse(BaseModel):
     top_employees: List[TopEmployeeResponse]
     top_products: List[TopProductResponse]
 
+
+
+class MarginReportRow(BaseModel):
+    """Строка отчёта по валовой марже"""
+    key: str
+    label: str
+    units_sold: int
+    revenue: float
+    cost: float
+    gross_profit: float
+    margin_percent: float
+
+
+class MarginReportResponse(BaseModel):
+    """Отчёт по валовой марже"""
+    group_by: str
+    date_from: Optional[date]
+    date_to: Optional[date]
+    rows: List[MarginReportRow]
+    total: MarginReportRow
+
+
+class InventoryItemResponse(BaseModel):
+    """Оборачиваемость и запас по товару"""
+    id: str
+    name: str
+    categoryName: str
+    rest_count: int
+    units_sold: int
+    daily_velocity: float
+    days_of_stock: Optional[float]  # None - продаж за окно не было
+    turnover_ratio: float
+    stock_value: float
+
+
+class InventoryReportResponse(BaseModel):
+    """Отчет по складским запасам"""
+    window_days: int
+    items: List[InventoryItemResponse]
+
+
+class LiveTopProductResponse(BaseModel):
+    """Товар в оперативном топе продаж"""
+    id: str
+    name: str
+    units_sold: int  # Оценка сверху
+    max_error: int  # Максимальная переоценка units_sold
+
+
+class LiveReportResponse(BaseModel):
+    """Оперативный топ продаж за последние минуты"""
+    window_minutes: int
+    top_products: List[LiveTopProductResponse]
+
+
+class SupplierMonthResponse(BaseModel):
+    """Закупки у поставщика за месяц"""
+    month: date
+    orders_count: int
+    lines_count: int
+    units: int
+    spend: float
+    avg_purchase_price: float  # Средняя цена единицы товара за месяц
+
+
+class SupplierReportItem(BaseModel):
+    """Показатели поставщика за период с помесячной разбивкой"""
+    id: str
+    name: str
+    orders_count: int
+    units: int
+    spend: float
+    avg_purchase_price: float
+    orders_per_month: float  # Заказов в месяц за период (месяцы без поставок тоже считаются)
+    months: List[SupplierMonthResponse]
+
+
+class SupplierReportResponse(BaseModel):
+    """Отчёт по закупкам у поставщиков"""
+    date_from: Optional[date]
+    date_to: Optional[date]
+    suppliers: List[SupplierReportItem]
@@ -1,8 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from typing import List
-from src.models import Employee, Sale, ProductToSale, Product, ProductColor, ProductCategory, ProductSize, ShopRest
-from src.reports.schemas import TopEmployeeResponse, TopProductResponse
+from sqlalchemy import select, func, desc, case, literal, nulls_last
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from src.models import (
+    Employee, Sale, ProductToSale, Product, ProductColor, ProductCategory, ProductSize, ShopRest,
+    SaleMarginRollup, ProductCost, Supplier, SupplierMonthlyRollup
+)
+from src.reports.schemas import (
+    TopEmployeeResponse, TopProductResponse, MarginReportRow, MarginReportResponse,
+    InventoryItemResponse, InventoryReportResponse, SupplierMonthResponse, SupplierReportItem,
+    SupplierReportResponse
+)
 
 
 class ReportsService:
@@ -115,3 +123,281 @@ class ReportsService:
 
         return products
 
+    @staticmethod
+    def _months_in_period(first: date, last: date) -> int:
+        """Число календарных месяцев с first по last включительно (не меньше одного)"""
+        return max(1, (last.year - first.year) * 12 + last.month - first.month + 1)
+
+    @staticmethod
+    def _margin_row(key: str, label: str, units_sold, revenue, cost) -> MarginReportRow:
+        """Собрать строку отчёта по марже из агрегатов"""
+        revenue = float(revenue or 0)
+        cost = float(cost or 0)
+        gross_profit = revenue - cost
+        return MarginReportRow(
+            key=key,
+            label=label,
+            units_sold=int(units_sold or 0),
+            revenue=round(revenue, 2),
+            cost=round(cost, 2),
+            gross_profit=round(gross_profit, 2),
+            margin_percent=round(gross_profit / revenue * 100, 2) if revenue else 0.0
+        )
+
+    @staticmethod
+    async def get_margin_report(
+        db: AsyncSession,
+        group_by: str = "product",
+        period: str = "day",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        limit: int = 100
+    ) -> MarginReportResponse:
+        """
+        Получить отчёт по валовой марже
+
+        Считается по дневным агрегатам SaleMarginRollup, поэтому стоимость
+        запроса зависит от количества агрегатов, а не от истории продаж.
+
+        Args:
+            db: сессия базы данных
+            group_by: группировка (product, category, employee, period)
+            period: шаг периода для group_by=period (day, week, month)
+            date_from: начало периода включительно
+            date_to: конец периода включительно
+            limit: максимальное количество строк
+
+        Returns:
+            Отчёт по марже со строками и итогом
+        """
+        units_sold = func.sum(SaleMarginRollup.unitsSold).label('units_sold')
+        revenue = func.sum(SaleMarginRollup.revenue).label('revenue')
+        cost = func.sum(SaleMarginRollup.cost).label('cost')
+
+        filters = []
+        if date_from:
+            filters.append(SaleMarginRollup.day >= date_from)
+        if date_to:
+            filters.append(SaleMarginRollup.day <= date_to)
+
+        if group_by == "product":
+            key, label = Product.id, Product.name
+            stmt = select(key, label, units_sold, revenue, cost).join(
+                Product, Product.id == SaleMarginRollup.productId
+            ).group_by(key, label)
+        elif group_by == "category":
+            key, label = ProductCategory.id, ProductCategory.name
+            stmt = select(key, label, units_sold, revenue, cost).join(
+                ProductCategory, ProductCategory.id == SaleMarginRollup.categoryId
+            ).group_by(key, label)
+        elif group_by == "employee":
+            key = Employee.id
+            label = func.concat_ws(' ', Employee.lastname, Employee.name, Employee.patronymic)
+            stmt = select(key, label, units_sold, revenue, cost).join(
+                Employee, Employee.id == SaleMarginRollup.employeeId
+            ).group_by(key, Employee.lastname, Employee.name, Employee.patronymic)
+        else:
+            key = func.to_char(func.date_trunc(period, SaleMarginRollup.day), 'YYYY-MM-DD')
+            stmt = select(key, key, units_sold, revenue, cost).group_by(key)
+
+        # Периоды идут по порядку, остальные группы - по убыванию прибыли
+        order = key if group_by == "period" else desc(revenue - cost)
+        stmt = stmt.where(*filters).order_by(order).limit(limit)
+
+        result = await db.execute(stmt)
+        rows = [
+            ReportsService._margin_row(row[0], row[1], row.units_sold, row.revenue, row.cost)
+            for row in result.all()
+        ]
+
+        # Итог по всему периоду, а не только по попавшим в limit строкам
+        total_result = await db.execute(select(units_sold, revenue, cost).where(*filters))
+        total_row = total_result.one()
+
+        return MarginReportResponse(
+            group_by=group_by,
+            date_from=date_from,
+            date_to=date_to,
+            rows=rows,
+            total=ReportsService._margin_row("total", "Итого", total_row.units_sold, total_row.revenue, total_row.cost)
+        )
+
+    @staticmethod
+    async def get_inventory_report(
+        db: AsyncSession,
+        window_days: int = 30,
+        sort_by: str = "days_of_stock",
+        offset: int = 0,
+        limit: int = 100
+    ) -> InventoryReportResponse:
+        """
+        Получить отчет по запасам: скорость продаж, дни запаса и оборачиваемость
+
+        Все показатели считаются одним запросом по дневным агрегатам продаж
+        для всего каталога, сортировка и пагинация выполняются в БД.
+
+        Args:
+            db: сессия базы данных
+            window_days: окно расчета скорости продаж в днях
+            sort_by: сортировка (days_of_stock, velocity, turnover)
+            offset: смещение
+            limit: лимит
+
+        Returns:
+            Отчет по запасам
+        """
+        # Дни агрегатов - UTC-даты Sale.createdAt, поэтому и окно считаем по UTC
+        since = datetime.utcnow().date() - timedelta(days=window_days - 1)
+        sold = (
+            select(
+                SaleMarginRollup.productId.label('product_id'),
+                func.sum(SaleMarginRollup.unitsSold).label('units')
+            )
+            .where(SaleMarginRollup.day >= since)
+            .group_by(SaleMarginRollup.productId)
+            .subquery()
+        )
+
+        rest = func.coalesce(ShopRest.restCount, 0)
+        units = func.coalesce(sold.c.units, 0)
+        velocity = (units * literal(1.0) / window_days).label('velocity')
+        days_of_stock = case((units > 0, rest * literal(1.0) / velocity), else_=None).label('days_of_stock')
+        # Средний запас за окно: остаток на начало приближаем как текущий + проданное
+        avg_stock = (rest + units / literal(2.0))
+        turnover = func.coalesce(units / func.nullif(avg_stock, 0), 0).label('turnover')
+
+        order = {
+            "days_of_stock": nulls_last(days_of_stock.asc()),
+            "velocity": velocity.desc(),
+            "turnover": turnover.desc()
+        }[sort_by]
+
+        stmt = (
+            select(
+                Product.id,
+                Product.name,
+                ProductCategory.name.label('category_name'),
+                rest.label('rest_count'),
+                units.label('units_sold'),
+                velocity,
+                days_of_stock,
+                turnover,
+                (rest * func.coalesce(ProductCost.avgCost, 0)).label('stock_value')
+            )
+            .join(ProductCategory, Product.categoryId == ProductCategory.id)
+            .outerjoin(ShopRest, Product.id == ShopRest.productId)
+            .outerjoin(ProductCost, Product.id == ProductCost.productId)
+            .outerjoin(sold, Product.id == sold.c.product_id)
+            .order_by(order, Product.id)
+            .offset(offset)
+            .limit(limit)
+        )
+
+        result = await db.execute(stmt)
+        items = [
+            InventoryItemResponse(
+                id=row.id,
+                name=row.name,
+                categoryName=row.category_name,
+                rest_count=int(row.rest_count),
+                units_sold=int(row.units_sold),
+                daily_velocity=round(float(row.velocity), 3),
+                days_of_stock=round(float(row.days_of_stock), 1) if row.days_of_stock is not None else None,
+                turnover_ratio=round(float(row.turnover), 3),
+                stock_value=round(float(row.stock_value), 2)
+            )
+            for row in result.all()
+        ]
+
+        return InventoryReportResponse(window_days=window_days, items=items)
+
+    @staticmethod
+    async def get_supplier_report(
+        db: AsyncSession,
+        supplier_id: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        limit: int = 20
+    ) -> SupplierReportResponse:
+        """
+        Получить отчет по закупкам у поставщиков
+
+        Считается по месячным агрегатам SupplierMonthlyRollup: поставщики
+        ранжируются по сумме закупок в БД, затем одним запросом читаются
+        их месяцы, поэтому строки заказов не перебираются.
+
+        Args:
+            db: сессия базы данных
+            supplier_id: только указанный поставщик
+            date_from: начало периода (учитывается месяц целиком)
+            date_to: конец периода (учитывается месяц целиком)
+            limit: количество поставщиков
+
+        Returns:
+            Поставщики по убыванию суммы закупок с помесячной разбивкой
+        """
+        filters = []
+        if supplier_id:
+            filters.append(SupplierMonthlyRollup.supplierId == supplier_id)
+        if date_from:
+            filters.append(SupplierMonthlyRollup.month >= date_from.replace(day=1))
+        if date_to:
+            filters.append(SupplierMonthlyRollup.month <= date_to)
+
+        spend = func.sum(SupplierMonthlyRollup.spend)
+        top_suppliers = (
+            select(SupplierMonthlyRollup.supplierId.label('supplier_id'), spend.label('spend'))
+            .where(*filters)
+            .group_by(SupplierMonthlyRollup.supplierId)
+            .order_by(spend.desc(), SupplierMonthlyRollup.supplierId)
+            .limit(limit)
+            .subquery()
+        )
+
+        stmt = (
+            select(SupplierMonthlyRollup, Supplier.name)
+            .join(top_suppliers, top_suppliers.c.supplier_id == SupplierMonthlyRollup.supplierId)
+            .join(Supplier, Supplier.id == SupplierMonthlyRollup.supplierId)
+            .where(*filters)
+            .order_by(top_suppliers.c.spend.desc(), SupplierMonthlyRollup.supplierId, SupplierMonthlyRollup.month)
+        )
+        result = await db.execute(stmt)
+
+        suppliers: List[SupplierReportItem] = []
+        for rollup, name in result.all():
+            if not suppliers or suppliers[-1].id != rollup.supplierId:
+                suppliers.append(SupplierReportItem(
+                    id=rollup.supplierId,
+                    name=name,
+                    orders_count=0,
+                    units=0,
+                    spend=0.0,
+                    avg_purchase_price=0.0,
+                    orders_per_month=0.0,
+                    months=[]
+                ))
+            item = suppliers[-1]
+            item.orders_count += rollup.ordersCount
+            item.units += rollup.units
+            item.spend += rollup.spend
+            item.months.append(SupplierMonthResponse(
+                month=rollup.month,
+                orders_count=rollup.ordersCount,
+                lines_count=rollup.linesCount,
+                units=rollup.units,
+                spend=round(rollup.spend, 2),
+                avg_purchase_price=round(rollup.spend / rollup.units, 2) if rollup.units else 0.0
+            ))
+
+        # Частота заказов - по всем месяцам периода, включая месяцы без поставок:
+        # от date_from (или первой поставки) до date_to (или текущего месяца, UTC)
+        current_month = datetime.utcnow().date().replace(day=1)
+        period_end = min(date_to, current_month) if date_to else current_month
+        for item in suppliers:
+            period_start = date_from or item.months[0].month
+            months_count = ReportsService._months_in_period(period_start, max(period_end, item.months[-1].month))
+            item.avg_purchase_price = round(item.spend / item.units, 2) if item.units else 0.0
+            item.orders_per_month = round(item.orders_count / months_count, 2)
+            item.spend = round(item.spend, 2)
+
+        return SupplierReportResponse(date_from=date_from, date_to=date_to, suppliers=suppliers)
@@ -0,0 +1,89 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from src.supplier.schemas import OrderProductItem
+
+MANIFEST_COLUMNS = ("productId", "count", "purchasePrice")
+
+# Строка манифеста: (номер строки, позиция) или (номер строки, текст ошибки)
+ManifestLine = Tuple[int, Union[OrderProductItem, str]]
+
+
+async def iter_text_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Разбить поток байтов на строки, не буферизуя тело запроса целиком"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+def _validate(line_no: int, data: dict) -> ManifestLine:
+    try:
+        item = OrderProductItem(**data)
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        return line_no, errors
+    if item.count <= 0:
+        return line_no, "count: количество должно быть больше нуля"
+    if item.purchasePrice < 0:
+        return line_no, "purchasePrice: цена не может быть отрицательной"
+    return line_no, item
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[ManifestLine]:
+    """
+    Разобрать CSV-манифест построчно
+
+    Первая строка - заголовок с колонками productId, count, purchasePrice.
+    Разделитель (запятая или точка с запятой) определяется по заголовку.
+    """
+    header: Optional[list] = None
+    delimiter = ","
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        if header is None:
+            delimiter = ";" if line.count(";") > line.count(",") else ","
+            header = [column.strip() for column in next(csv.reader([line], delimiter=delimiter))]
+            missing = [column for column in MANIFEST_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"В заголовке CSV нет колонок: {', '.join(missing)}")
+            continue
+
+        values = next(csv.reader([line], delimiter=delimiter))
+        if len(values) != len(header):
+            yield line_no, f"ожидалось колонок: {len(header)}, получено: {len(values)}"
+            continue
+        row = dict(zip(header, (value.strip() for value in values)))
+        yield _validate(line_no, {column: row[column] for column in MANIFEST_COLUMNS})
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[ManifestLine]:
+    """Разобрать NDJSON-манифест: один JSON-объект позиции на строку"""
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"некорректный JSON: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, "ожидался JSON-объект"
+            continue
+        yield _validate(line_no, data)
@@ -0,0 +1,227 @@
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, func, literal, extract, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models import Product, ShopRest, Supplier, OrderToSupplier, SaleMarginRollup
+from src.supplier.schemas import ReorderSuggestionResponse
+
+# Срок пополнения, если по товару было меньше двух поставок
+DEFAULT_LEAD_TIME_DAYS = 7.0
+# Коэффициент страхового запаса (z для уровня сервиса 95%)
+SERVICE_LEVEL_Z = 1.65
+# Сколько истории поставок учитывать при расчёте сроков
+LEAD_TIME_HISTORY_DAYS = 365
+
+
+class ReorderCache:
+    """
+    Кэш рекомендаций по дозаказу
+
+    Расчёт идёт по всему каталогу, поэтому результат хранится до
+    следующей продажи или поставки: сервисы вызывают invalidate() после коммита.
+    Инвалидация видна только своему процессу, а окно спроса отсчитывается
+    от текущей даты, поэтому запись живёт не дольше ttl_seconds и только
+    в пределах дня (UTC, как дни агрегатов продаж), в который рассчитана.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # ключ -> (рекомендации, время расчета, дата расчета)
+        self._entries: Dict[Tuple, Tuple[List[ReorderSuggestionResponse], float, date]] = {}
+        # Растет при каждой инвалидации: результат расчета, начатого до нее, не сохраняем
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at, day = entry
+            if time.monotonic() - stored_at < self.ttl_seconds and day == datetime.utcnow().date():
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Tuple, value: List[ReorderSuggestionResponse], version: int) -> None:
+        if version != self.version:
+            return
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Вытесняем самую раннюю запись
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (value, time.monotonic(), datetime.utcnow().date())
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._entries.clear()
+
+
+reorder_cache = ReorderCache(settings.REORDER_CACHE_TTL_SECONDS)
+
+
+class ReorderService:
+    @staticmethod
+    async def compute_suggestions(
+        db: AsyncSession,
+        window_days: int = 30,
+        coverage_days: int = 14,
+        include_all: bool = False
+    ) -> List[ReorderSuggestionResponse]:
+        """
+        Рассчитать точки и объемы дозаказа для всего каталога одним запросом
+
+        Скорость продаж и ее разброс берутся из дневных агрегатов за окно,
+        срок пополнения - средний интервал между поставками товара от его
+        последнего поставщика (дата приемки в заказах не хранится).
+
+        Args:
+            db: сессия базы данных
+            window_days: окно расчета спроса в днях
+            coverage_days: на сколько дней спроса заказывать сверх точки дозаказа
+            include_all: вернуть все товары, а не только требующие дозаказа
+
+        Returns:
+            Рекомендации, самые срочные первыми
+        """
+        # Дни агрегатов - UTC-даты Sale.createdAt
+        since = datetime.utcnow().date() - timedelta(days=window_days - 1)
+
+        # Продажи по дням, затем сумма и сумма квадратов для дисперсии (дни без продаж = 0)
+        daily = (
+            select(
+                SaleMarginRollup.productId.label('product_id'),
+                func.sum(SaleMarginRollup.unitsSold).label('units')
+            )
+            .where(SaleMarginRollup.day >= since)
+            .group_by(SaleMarginRollup.productId, SaleMarginRollup.day)
+            .cte('daily')
+        )
+        demand = (
+            select(
+                daily.c.product_id,
+                func.sum(daily.c.units).label('units'),
+                func.sum(daily.c.units * daily.c.units).label('units_sq')
+            )
+            .group_by(daily.c.product_id)
+            .cte('demand')
+        )
+
+        # Поставки товара по заказам и интервалы между ними у одного поставщика
+        deliveries = (
+            select(
+                OrderToSupplier.ProductId.label('product_id'),
+                OrderToSupplier.supplierId.label('supplier_id'),
+                func.min(OrderToSupplier.createdAt).label('created_at')
+            )
+            .where(OrderToSupplier.createdAt >= datetime.utcnow() - timedelta(days=LEAD_TIME_HISTORY_DAYS))
+            .group_by(OrderToSupplier.ProductId, OrderToSupplier.supplierId, OrderToSupplier.purchaseOrderId)
+            .cte('deliveries')
+        )
+        previous = func.lag(deliveries.c.created_at).over(
+            partition_by=(deliveries.c.product_id, deliveries.c.supplier_id),
+            order_by=deliveries.c.created_at
+        )
+        intervals = (
+            select(
+                deliveries.c.product_id,
+                deliveries.c.supplier_id,
+                (extract('epoch', deliveries.c.created_at - previous) / 86400).label('interval_days')
+            )
+            .cte('intervals')
+        )
+        lead = (
+            select(
+                intervals.c.product_id,
+                intervals.c.supplier_id,
+                func.avg(intervals.c.interval_days).label('lead_days')
+            )
+            .where(intervals.c.interval_days.is_not(None))
+            .group_by(intervals.c.product_id, intervals.c.supplier_id)
+            .cte('lead')
+        )
+
+        # Последний поставщик и цена закупки по товару
+        latest = (
+            select(
+                OrderToSupplier.ProductId.label('product_id'),
+                OrderToSupplier.supplierId.label('supplier_id'),
+                OrderToSupplier.purchasePrice.label('purchase_price')
+            )
+            .distinct(OrderToSupplier.ProductId)
+            .order_by(OrderToSupplier.ProductId, OrderToSupplier.createdAt.desc())
+            .cte('latest')
+        )
+
+        rest = func.coalesce(ShopRest.restCount, 0)
+        units = func.coalesce(demand.c.units, 0)
+        velocity = units * literal(1.0) / window_days
+        variance = func.greatest(func.coalesce(demand.c.units_sq, 0) * literal(1.0) / window_days - velocity * velocity, 0)
+        lead_days = func.greatest(func.coalesce(lead.c.lead_days, DEFAULT_LEAD_TIME_DAYS), 1)
+        safety_stock = SERVICE_LEVEL_Z * func.sqrt(variance) * func.sqrt(lead_days)
+        reorder_point = velocity * lead_days + safety_stock
+        quantity = func.ceil(func.greatest(reorder_point + velocity * coverage_days - rest, 0))
+
+        stmt = (
+            select(
+                Product.id,
+                Product.name,
+                rest.label('rest_count'),
+                velocity.label('velocity'),
+                lead_days.label('lead_days'),
+                safety_stock.label('safety_stock'),
+                reorder_point.label('reorder_point'),
+                quantity.label('quantity'),
+                latest.c.supplier_id,
+                Supplier.name.label('supplier_name'),
+                latest.c.purchase_price
+            )
+            .outerjoin(ShopRest, ShopRest.productId == Product.id)
+            .outerjoin(demand, demand.c.product_id == Product.id)
+            .outerjoin(latest, latest.c.product_id == Product.id)
+            .outerjoin(Supplier, Supplier.id == latest.c.supplier_id)
+            .outerjoin(lead, and_(lead.c.product_id == Product.id, lead.c.supplier_id == latest.c.supplier_id))
+            .order_by((rest - reorder_point).asc(), Product.id)
+        )
+        if not include_all:
+            stmt = stmt.where(units > 0, rest <= reorder_point)
+
+        result = await db.execute(stmt)
+        return [
+            ReorderSuggestionResponse(
+                productId=row.id,
+                productName=row.name,
+                restCount=int(row.rest_count),
+                dailyVelocity=round(float(row.velocity), 3),
+                leadTimeDays=round(float(row.lead_days), 1),
+                safetyStock=round(float(row.safety_stock), 1),
+                reorderPoint=math.ceil(float(row.reorder_point)),
+                suggestedQuantity=int(row.quantity),
+                supplierId=row.supplier_id,
+                supplierName=row.supplier_name,
+                lastPurchasePrice=row.purchase_price
+            )
+            for row in result.all()
+        ]
+
+    @staticmethod
+    async def get_suggestions(
+        db: AsyncSession,
+        window_days: int = 30,
+        coverage_days: int = 14,
+        include_all: bool = False
+    ) -> List[ReorderSuggestionResponse]:
+        """Получить рекомендации по дозаказу из кэша или рассчитать заново"""
+        key = (window_days, coverage_days, include_all)
+        suggestions = reorder_cache.get(key)
+        if suggestions is None:
+            version = reorder_cache.version
+            suggestions = await ReorderService.compute_suggestions(db, window_days, coverage_days, include_all)
+            reorder_cache.set(key, suggestions, version)
+        return suggestions
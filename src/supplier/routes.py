@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
@@ -7,9 +7,13 @@ from src.supplier.schemas import (
     SupplierCreate,
     SupplierResponse,
     OrderCreate,
-    OrderResponse
+    OrderResponse,
+    OrderImportResponse,
+    ReorderSuggestionResponse
 )
 from src.supplier.service import SupplierService
+from src.supplier.manifest import iter_text_lines, parse_csv, parse_ndjson
+from src.supplier.reorder import ReorderService
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
@@ -20,16 +24,8 @@ async def create_supplier(
     db: AsyncSession = Depends(get_db)
 ):
     """Создать поставщика"""
-    try:
-        print(f"[SUPPLIER_ROUTE] Received request: {supplier_data}")
-        result = await SupplierService.create_supplier(db, supplier_data)
-        print(f"[SUPPLIER_ROUTE] Success: {result}")
-        return result
-    except Exception as e:
-        print(f"[SUPPLIER_ROUTE] ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+    # Ошибки логирует сервис
+    return await SupplierService.create_supplier(db, supplier_data)
 
 
 @router.get("/", response_model=List[SupplierResponse])
@@ -38,30 +34,88 @@ async def get_suppliers(db: AsyncSession = Depends(get_db)):
     return await SupplierService.get_all_suppliers(db)
 
 
+@router.get("/reorder-suggestions", response_model=List[ReorderSuggestionResponse])
+async def get_reorder_suggestions(
+    db: AsyncSession = Depends(get_db),
+    window_days: int = Query(30, ge=7, le=365, description="Окно расчета спроса, дней"),
+    coverage_days: int = Query(14, ge=1, le=180, description="На сколько дней спроса заказывать"),
+    include_all: bool = Query(False, description="Все товары, а не только требующие дозаказа"),
+    offset: int = Query(0, ge=0, description="Смещение"),
+    limit: int = Query(100, ge=1, le=1000, description="Лимит")
+):
+    """
+    Рекомендации по дозаказу товаров
+
+    Рассчитываются по всему каталогу сразу и кэшируются до следующей продажи или поставки
+    """
+    suggestions = await ReorderService.get_suggestions(db, window_days, coverage_days, include_all)
+    return suggestions[offset:offset + limit]
+
+
 @router.post("/orders")
 async def create_order(
     order_data: OrderCreate,
     db: AsyncSession = Depends(get_db)
 ):
     """Создать заказ поставщику"""
+    # Ошибки логирует сервис
+    result = await SupplierService.create_order(db, order_data)
+    return {"message": "Order created successfully", "id": result.id}
+
+
+@router.post("/orders/import", response_model=OrderImportResponse)
+async def import_order(
+    request: Request,
+    supplierId: str = Query(..., description="ID поставщика"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Формат манифеста (по умолчанию по Content-Type)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Импортировать поставку из манифеста CSV или NDJSON
+
+    Тело запроса читается потоком и загружается пачками, каждая пачка
+    сохраняется сразу. Колонки: productId, count, purchasePrice.
+    Ошибочные строки пропускаются и перечисляются в ответе, прогресс
+    публикуется в поток событий (тема import).
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "json" in content_type else "csv"
+
+    lines = iter_text_lines(request.stream())
+    manifest = parse_ndjson(lines) if format == "ndjson" else parse_csv(lines)
     try:
-        print(f"[ORDER_ROUTE] Received order request: {order_data}")
-        result = await SupplierService.create_order(db, order_data)
-        print(f"[ORDER_ROUTE] Order created successfully: {result}")
-        return {"message": "Order created successfully"}
-    except Exception as e:
-        print(f"[ORDER_ROUTE] ERROR creating order: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+        return await SupplierService.import_order(db, supplierId, manifest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/orders")
 async def get_orders(
+    response: Response,
     search: Optional[str] = Query(None, description="Поиск по названию товара или ФИО поставщика"),
+    limit: int = Query(100, ge=1, le=500, description="Лимит заказов на странице"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Получить список заказов с группировкой по поставщику и дате"""
-    return await SupplierService.get_all_orders(db, search)
+    """
+    Получить список заказов с группировкой по поставщику и дате
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor
+    """
+    try:
+        orders, next_cursor = await SupplierService.get_all_orders(db, search, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return orders
 
 
+@router.get("/orders/{order_id}", response_model=OrderResponse)
+async def get_order(order_id: str, db: AsyncSession = Depends(get_db)):
+    """Получить заказ поставщику по ID"""
+    order = await SupplierService.get_order_by_id(db, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Заказ не найден")
+    return order
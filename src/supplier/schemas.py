@@ -53,8 +53,39 @@ class OrderResponse(BaseModel):
     supplierName: str
     supplierContacts: str
     createdAt: datetime
+    totalCount: int
+    totalAmount: float
     products: List[OrderProductResponse]
 
     class Config:
         from_attributes = True
 
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class OrderImportResponse(BaseModel):
+    orderId: Optional[str]  # None, если не удалось принять ни одной строки
+    totalLines: int
+    importedLines: int
+    failedLines: int
+    chunks: int
+    errors: List[ImportLineError]
+    errorsTruncated: bool
+
+
+class ReorderSuggestionResponse(BaseModel):
+    productId: str
+    productName: str
+    restCount: int
+    dailyVelocity: float  # Средние продажи в день за окно
+    leadTimeDays: float  # Средний интервал между поставками
+    safetyStock: float
+    reorderPoint: int  # Остаток, при котором пора заказывать
+    suggestedQuantity: int
+    supplierId: Optional[str]  # Последний поставщик товара
+    supplierName: Optional[str]
+    lastPurchasePrice: Optional[float]
@@ -1,11 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, update, insert, case, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import joinedload
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
+import base64
+import json
+import logging
 
-from src.models import Supplier, OrderToSupplier, Product, ShopRest
-from .schemas import SupplierCreate, OrderCreate, OrderProductItem
+from src.models import Supplier, OrderToSupplier, PurchaseOrder, Product, ShopRest, generate_uuid
+from src.reports.ledger import CostLedger
+from src.product.prices import PriceHistoryService
+from src.events.hub import event_hub
+from src.metrics import DELIVERIES_RECEIVED, UNITS_RECEIVED
+from .schemas import SupplierCreate, OrderCreate, OrderProductItem, OrderImportResponse, ImportLineError
+from .manifest import ManifestLine
+from .reorder import reorder_cache
+
+logger = logging.getLogger(__name__)
+
+# Размер пачки строк при импорте манифеста поставки
+IMPORT_CHUNK_SIZE = 500
+# Сколько ошибок по строкам возвращать в ответе импорта
+IMPORT_MAX_ERRORS = 1000
 
 
 class SupplierService:
@@ -19,22 +36,18 @@ class SupplierService:
     async def create_supplier(db: AsyncSession, supplier_data: SupplierCreate) -> Supplier:
         """Создать нового поставщика"""
         try:
-            print(f"[SUPPLIER_SERVICE] Creating supplier: name={supplier_data.name}, contacts={supplier_data.contacts}")
+            logger.info("Создание поставщика: %s", supplier_data.name)
             supplier = Supplier(
                 name=supplier_data.name,
                 contacts=supplier_data.contacts
             )
             db.add(supplier)
-            print(f"[SUPPLIER_SERVICE] Supplier added to session")
             await db.commit()
-            print(f"[SUPPLIER_SERVICE] Commit successful")
             await db.refresh(supplier)
-            print(f"[SUPPLIER_SERVICE] Supplier created with id={supplier.id}")
+            logger.debug("Поставщик создан с ID: %s", supplier.id)
             return supplier
-        except Exception as e:
-            print(f"[SUPPLIER_SERVICE] ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Ошибка при создании поставщика")
             await db.rollback()
             raise
 
@@ -45,21 +58,119 @@ class SupplierService:
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def create_order(db: AsyncSession, order_data: OrderCreate) -> OrderToSupplier:
+    async def _find_missing_products(db: AsyncSession, product_ids) -> set:
+        """Найти несуществующие товары среди переданных ID одним запросом"""
+        product_ids = set(product_ids)
+        result = await db.execute(select(Product.id).where(Product.id.in_(product_ids)))
+        return product_ids - set(result.scalars().all())
+
+    @staticmethod
+    async def _receive_lines(
+        db: AsyncSession,
+        purchase_order: PurchaseOrder,
+        items: List[OrderProductItem],
+        check_products: bool = True,
+        new_order: bool = True
+    ) -> Dict[str, int]:
+        """
+        Принять строки поставки пакетно
+
+        Товары проверяются одним запросом IN, цены обновляются одним UPDATE,
+        строки заказа вставляются одной пачкой, а остатки - одним
+        INSERT ... ON CONFLICT, поэтому число запросов не зависит от числа строк.
+        new_order=False для последующих пачек одного заказа (импорт), чтобы
+        заказ учитывался в агрегатах поставщика один раз.
+
+        Returns:
+            Новые остатки по товарам поставки {productId: restCount}
+        """
+        if not items:
+            return {}
+
+        if check_products:
+            missing = await SupplierService._find_missing_products(db, (item.productId for item in items))
+            if missing:
+                raise ValueError(f"Продукт {sorted(missing)[0]} не найден")
+
+        # Обновляем цену товара (ставим дефолтную из закупки, при повторах - последнюю)
+        prices = {item.productId: item.purchasePrice for item in items}
+        # Сначала блокируем товары по порядку id: UPDATE ... IN берет блокировки
+        # в порядке плана, и параллельные поставки блокировали друг друга взаимно.
+        # FOR NO KEY UPDATE (key_share) - ключ не меняется, и блокировка не конфликтует
+        # с FOR KEY SHARE от вставок ProductToSale в параллельных продажах
+        await db.execute(
+            select(Product.id).where(Product.id.in_(prices)).order_by(Product.id)
+            .with_for_update(key_share=True)
+        )
+        await PriceHistoryService.record_prices(db, prices, purchase_order.createdAt)
+        await db.execute(
+            update(Product)
+            .where(Product.id.in_(prices))
+            .values(price=case(prices, value=Product.id))
+            .execution_options(synchronize_session=False)
+        )
+
+        # Создаем строки заказа с ценой закупки
+        await db.execute(
+            insert(OrderToSupplier),
+            [
+                {
+                    "id": generate_uuid(),
+                    "purchaseOrderId": purchase_order.id,
+                    "supplierId": purchase_order.supplierId,
+                    "ProductId": item.productId,
+                    "count": item.count,
+                    "purchasePrice": item.purchasePrice,
+                    "createdAt": purchase_order.createdAt
+                }
+                for item in items
+            ]
+        )
+
+        # Обновляем остатки на складе (создаем, если остатков не было)
+        counts = {}
+        for item in items:
+            counts[item.productId] = counts.get(item.productId, 0) + item.count
+        # По порядку товаров, как продажи: одинаковый порядок блокировок строк остатков
+        stmt = pg_insert(ShopRest).values([
+            {"id": generate_uuid(), "productId": product_id, "restCount": count}
+            for product_id, count in sorted(counts.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ShopRest.productId],
+            set_={"restCount": ShopRest.restCount + stmt.excluded.restCount}
+        ).returning(ShopRest.productId, ShopRest.restCount)
+        result = await db.execute(stmt)
+        stock_levels = dict(result.all())
+
+        # Пересчитываем среднюю себестоимость поступивших товаров
+        await CostLedger.record_purchases(
+            db,
+            [(item.productId, item.count, item.purchasePrice) for item in items]
+        )
+        await CostLedger.record_supplier_delivery(
+            db,
+            purchase_order,
+            [(item.count, item.purchasePrice) for item in items],
+            new_order=new_order
+        )
+
+        return stock_levels
+
+    @staticmethod
+    async def create_order(db: AsyncSession, order_data: OrderCreate) -> PurchaseOrder:
         """Создать заказ у поставщика"""
         try:
-            print(f"[SUPPLIER_SERVICE] Creating order with data: {order_data}")
+            logger.info("Создание заказа поставщику: позиций %d", len(order_data.products))
 
             # Если указан существующий поставщик
             if order_data.supplierId:
-                print(f"[SUPPLIER_SERVICE] Looking for supplier: {order_data.supplierId}")
                 supplier = await SupplierService.get_supplier_by_id(db, order_data.supplierId)
                 if not supplier:
                     raise ValueError("Поставщик не найден")
-                print(f"[SUPPLIER_SERVICE] Found supplier: {supplier.name}")
+                logger.debug("Найден поставщик: %s", supplier.id)
             # Если нужно создать нового поставщика
             elif order_data.supplierName and order_data.supplierContacts:
-                print(f"[SUPPLIER_SERVICE] Creating new supplier: {order_data.supplierName}")
                 supplier = await SupplierService.create_supplier(
                     db,
                     SupplierCreate(
@@ -67,104 +178,200 @@ class SupplierService:
                         contacts=order_data.supplierContacts
                     )
                 )
-                print(f"[SUPPLIER_SERVICE] New supplier created: {supplier.id}")
+                logger.debug("Для заказа создан новый поставщик: %s", supplier.id)
             else:
                 raise ValueError("Необходимо указать существующего поставщика или данные нового")
 
-            # Создаем записи заказа для каждого продукта
-            orders = []
-            for product_item in order_data.products:
-                print(f"[SUPPLIER_SERVICE] Processing product: {product_item.productId}, count: {product_item.count}, purchasePrice: {product_item.purchasePrice}")
-
-                # Проверяем существование продукта
-                result = await db.execute(select(Product).where(Product.id == product_item.productId))
-                product = result.scalar_one_or_none()
-                if not product:
-                    raise ValueError(f"Продукт {product_item.productId} не найден")
-
-                print(f"[SUPPLIER_SERVICE] Found product: {product.name}, current price: {product.price}")
-
-                # Обновляем цену товара (ставим дефолтную из закупки)
-                product.price = product_item.purchasePrice
-                print(f"[SUPPLIER_SERVICE] Updated product price to: {product.price}")
-
-                # Создаем заказ с ценой закупки
-                order = OrderToSupplier(
-                    supplierId=supplier.id,
-                    ProductId=product_item.productId,
-                    count=product_item.count,
-                    purchasePrice=product_item.purchasePrice
-                )
-                db.add(order)
-                orders.append(order)
-                print(f"[SUPPLIER_SERVICE] Order item added to session")
+            # Шапка заказа: итоги считаем сразу, чтобы список заказов их не пересчитывал
+            purchase_order = PurchaseOrder(
+                id=generate_uuid(),
+                supplierId=supplier.id,
+                createdAt=datetime.utcnow(),
+                totalCount=sum(item.count for item in order_data.products),
+                totalAmount=sum(item.count * item.purchasePrice for item in order_data.products),
+                linesCount=len(order_data.products)
+            )
+            db.add(purchase_order)
+            await db.flush()
 
-                # Обновляем остатки на складе
-                result = await db.execute(
-                    select(ShopRest).where(ShopRest.productId == product_item.productId)
-                )
-                shop_rest = result.scalar_one_or_none()
-                if shop_rest:
-                    old_count = shop_rest.restCount
-                    shop_rest.restCount += product_item.count
-                    print(f"[SUPPLIER_SERVICE] Updated stock: {old_count} -> {shop_rest.restCount}")
+            stock_levels = await SupplierService._receive_lines(db, purchase_order, order_data.products)
+
+            await db.commit()
+            logger.info("Заказ %s создан: строк %d", purchase_order.id, purchase_order.linesCount)
+            reorder_cache.invalidate()
+            DELIVERIES_RECEIVED.inc()
+            UNITS_RECEIVED.inc(purchase_order.totalCount)
+
+            event_hub.publish("delivery", {
+                "orderId": purchase_order.id,
+                "supplierId": supplier.id,
+                "items": [
+                    {"productId": item.productId, "count": item.count, "purchasePrice": item.purchasePrice}
+                    for item in order_data.products
+                ]
+            })
+            event_hub.publish("stock", {
+                "items": [
+                    {"productId": product_id, "restCount": rest_count}
+                    for product_id, rest_count in stock_levels.items()
+                ]
+            })
+            return purchase_order
+
+        except Exception:
+            logger.exception("Ошибка при создании заказа")
+            await db.rollback()
+            raise
+
+    @staticmethod
+    async def import_order(
+        db: AsyncSession,
+        supplier_id: str,
+        manifest: AsyncIterator[ManifestLine]
+    ) -> OrderImportResponse:
+        """
+        Импортировать поставку из манифеста
+
+        Строки читаются из потока и принимаются пачками по IMPORT_CHUNK_SIZE:
+        товары пачки проверяются одним запросом, корректные строки загружаются
+        через _receive_lines, каждая пачка коммитится отдельно. Все строки
+        попадают в один заказ, ошибочные строки пропускаются и возвращаются в ответе.
+        """
+        supplier = await SupplierService.get_supplier_by_id(db, supplier_id)
+        if not supplier:
+            raise ValueError("Поставщик не найден")
+
+        purchase_order: Optional[PurchaseOrder] = None
+        errors: List[ImportLineError] = []
+        total_lines = imported_lines = failed_lines = chunks = 0
+
+        def add_error(line_no: int, error: str):
+            nonlocal failed_lines
+            failed_lines += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append(ImportLineError(line=line_no, error=error))
+
+        async def flush(chunk: List[Tuple[int, OrderProductItem]]):
+            nonlocal purchase_order, imported_lines, chunks
+            missing = await SupplierService._find_missing_products(db, (item.productId for _, item in chunk))
+            items = []
+            for line_no, item in chunk:
+                if item.productId in missing:
+                    add_error(line_no, f"Продукт {item.productId} не найден")
                 else:
-                    # Если остатков не было, создаем
-                    shop_rest = ShopRest(
-                        productId=product_item.productId,
-                        restCount=product_item.count
+                    items.append(item)
+
+            if items:
+                new_order = purchase_order is None
+                if new_order:
+                    purchase_order = PurchaseOrder(id=generate_uuid(), supplierId=supplier.id, createdAt=datetime.utcnow())
+                    db.add(purchase_order)
+                    await db.flush()
+                stock_levels = await SupplierService._receive_lines(
+                    db, purchase_order, items, check_products=False, new_order=new_order
+                )
+                await db.execute(
+                    update(PurchaseOrder)
+                    .where(PurchaseOrder.id == purchase_order.id)
+                    .values(
+                        totalCount=PurchaseOrder.totalCount + sum(item.count for item in items),
+                        totalAmount=PurchaseOrder.totalAmount + sum(item.count * item.purchasePrice for item in items),
+                        linesCount=PurchaseOrder.linesCount + len(items)
                     )
-                    db.add(shop_rest)
-                    print(f"[SUPPLIER_SERVICE] Created new stock entry: {product_item.count}")
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                reorder_cache.invalidate()
+                if new_order:
+                    DELIVERIES_RECEIVED.inc()
+                UNITS_RECEIVED.inc(sum(item.count for item in items))
+                imported_lines += len(items)
+                event_hub.publish("stock", {
+                    "items": [
+                        {"productId": product_id, "restCount": rest_count}
+                        for product_id, rest_count in stock_levels.items()
+                    ]
+                })
 
-            print(f"[SUPPLIER_SERVICE] Committing {len(orders)} order items to database...")
-            await db.commit()
-            print(f"[SUPPLIER_SERVICE] Order successfully created!")
-            return orders[0] if orders else None
+            chunks += 1
+            logger.debug("Импорт, пачка %d: загружено %d, ошибок %d", chunks, imported_lines, failed_lines)
+            event_hub.publish("import", {
+                "orderId": purchase_order.id if purchase_order else None,
+                "supplierId": supplier.id,
+                "processedLines": total_lines,
+                "importedLines": imported_lines,
+                "failedLines": failed_lines
+            })
 
-        except Exception as e:
-            print(f"[SUPPLIER_SERVICE] ERROR in create_order: {e}")
-            import traceback
-            traceback.print_exc()
+        chunk: List[Tuple[int, OrderProductItem]] = []
+        try:
+            async for line_no, parsed in manifest:
+                total_lines += 1
+                if isinstance(parsed, str):
+                    add_error(line_no, parsed)
+                    continue
+                chunk.append((line_no, parsed))
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    await flush(chunk)
+                    chunk = []
+            if chunk:
+                await flush(chunk)
+        except Exception:
             await db.rollback()
             raise
 
+        if purchase_order is not None:
+            event_hub.publish("delivery", {
+                "orderId": purchase_order.id,
+                "supplierId": supplier.id,
+                "importedLines": imported_lines
+            })
+
+        # Ошибки товаров выявляются при сбросе пачки, поэтому упорядочиваем по строкам
+        errors.sort(key=lambda error: error.line)
+        return OrderImportResponse(
+            orderId=purchase_order.id if purchase_order else None,
+            totalLines=total_lines,
+            importedLines=imported_lines,
+            failedLines=failed_lines,
+            chunks=chunks,
+            errors=errors,
+            errorsTruncated=failed_lines > len(errors)
+        )
+
     @staticmethod
-    async def get_all_orders(db: AsyncSession, search: Optional[str] = None) -> List[dict]:
-        """Получить все заказы с информацией о продуктах и поставщиках"""
-        query = (
+    def encode_orders_cursor(created_at: datetime, order_id: str) -> str:
+        """Курсор страницы заказов: последний заказ страницы (дата, id)"""
+        raw = json.dumps([created_at.isoformat(), order_id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_orders_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            created_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), order_id
+        except Exception:
+            raise ValueError("Некорректный курсор")
+
+    @staticmethod
+    async def _load_order_lines(db: AsyncSession, order_ids: List[str]) -> dict:
+        """Загрузить строки заказов одним запросом, сгруппировав по заказу"""
+        lines_query = (
             select(OrderToSupplier)
             .options(
-                joinedload(OrderToSupplier.supplier),
                 joinedload(OrderToSupplier.product).joinedload(Product.color),
                 joinedload(OrderToSupplier.product).joinedload(Product.category),
                 joinedload(OrderToSupplier.product).joinedload(Product.size)
             )
+            .where(OrderToSupplier.purchaseOrderId.in_(order_ids))
+            .order_by(OrderToSupplier.id)
         )
+        lines = (await db.execute(lines_query)).scalars().unique().all()
 
-        result = await db.execute(query)
-        all_orders = result.scalars().unique().all()
-
-        # Группируем заказы по поставщику и дате
-        orders_by_group = {}
-        for order in all_orders:
-            # Создаем ключ группировки (supplierId + дата)
-            date_key = order.createdAt.strftime("%Y-%m-%d %H:%M")
-            group_key = f"{order.supplierId}_{date_key}"
-
-            if group_key not in orders_by_group:
-                orders_by_group[group_key] = {
-                    "id": order.id,
-                    "supplierId": order.supplierId,
-                    "supplierName": order.supplier.name,
-                    "supplierContacts": order.supplier.contacts,
-                    "createdAt": order.createdAt,
-                    "products": []
-                }
-
-            # Добавляем продукт в группу
+        products_by_order = {order_id: [] for order_id in order_ids}
+        for order in lines:
             product = order.product
-            orders_by_group[group_key]["products"].append({
+            products_by_order[order.purchaseOrderId].append({
                 "id": product.id,
                 "name": product.name,
                 "sizeValue": product.size.value if product.size else None,
@@ -175,21 +382,92 @@ class SupplierService:
                 "categoryName": product.category.name if product.category else None,
                 "count": order.count
             })
+        return products_by_order
+
+    @staticmethod
+    def _order_to_dict(purchase_order: PurchaseOrder, products: List[dict]) -> dict:
+        return {
+            "id": purchase_order.id,
+            "supplierId": purchase_order.supplierId,
+            "supplierName": purchase_order.supplier.name,
+            "supplierContacts": purchase_order.supplier.contacts,
+            "createdAt": purchase_order.createdAt,
+            "totalCount": purchase_order.totalCount,
+            "totalAmount": purchase_order.totalAmount,
+            "products": products
+        }
+
+    @staticmethod
+    async def get_order_by_id(db: AsyncSession, order_id: str) -> Optional[dict]:
+        """Получить заказ поставщику по ID"""
+        result = await db.execute(
+            select(PurchaseOrder)
+            .options(joinedload(PurchaseOrder.supplier))
+            .where(PurchaseOrder.id == order_id)
+        )
+        purchase_order = result.scalar_one_or_none()
+        if not purchase_order:
+            return None
+
+        products_by_order = await SupplierService._load_order_lines(db, [purchase_order.id])
+        return SupplierService._order_to_dict(purchase_order, products_by_order[purchase_order.id])
+
+    @staticmethod
+    async def get_all_orders(
+        db: AsyncSession,
+        search: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Получить заказы с информацией о продуктах и поставщиках
 
-        # Преобразуем в список
-        result_orders = list(orders_by_group.values())
+        Страница заказов выбирается по индексу шапок PurchaseOrder,
+        затем одним запросом загружаются строки только этих заказов.
+
+        Returns:
+            Заказы страницы и курсор следующей страницы (None, если страница последняя)
+        """
+        query = (
+            select(PurchaseOrder)
+            .join(Supplier, Supplier.id == PurchaseOrder.supplierId)
+            .options(joinedload(PurchaseOrder.supplier))
+        )
 
-        # Фильтруем по поиску если указан
         if search:
-            search_lower = search.lower()
-            result_orders = [
-                order for order in result_orders
-                if search_lower in order["supplierName"].lower()
-                or any(search_lower in p["name"].lower() for p in order["products"])
-            ]
+            pattern = f"%{search}%"
+            matching_lines = (
+                select(OrderToSupplier.id)
+                .join(Product, Product.id == OrderToSupplier.ProductId)
+                .where(
+                    OrderToSupplier.purchaseOrderId == PurchaseOrder.id,
+                    Product.name.ilike(pattern)
+                )
+            )
+            query = query.where(or_(Supplier.name.ilike(pattern), matching_lines.exists()))
+
+        if cursor:
+            cursor_created_at, cursor_id = SupplierService.decode_orders_cursor(cursor)
+            query = query.where(
+                tuple_(PurchaseOrder.createdAt, PurchaseOrder.id) < tuple_(cursor_created_at, cursor_id)
+            )
+
+        # Новые первыми; берём на один заказ больше, чтобы понять, есть ли следующая страница
+        query = query.order_by(PurchaseOrder.createdAt.desc(), PurchaseOrder.id.desc()).limit(limit + 1)
+        purchase_orders = (await db.execute(query)).scalars().all()
 
-        # Сортируем по дате (новые первыми)
-        result_orders.sort(key=lambda x: x["createdAt"], reverse=True)
+        next_cursor = None
+        if len(purchase_orders) > limit:
+            purchase_orders = purchase_orders[:limit]
+            last = purchase_orders[-1]
+            next_cursor = SupplierService.encode_orders_cursor(last.createdAt, last.id)
 
-        return result_orders
+        if not purchase_orders:
+            return [], None
 
+        products_by_order = await SupplierService._load_order_lines(db, [po.id for po in purchase_orders])
+        orders = [
+            SupplierService._order_to_dict(po, products_by_order[po.id])
+            for po in purchase_orders
+        ]
+        return orders, next_cursor
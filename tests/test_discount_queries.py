@@ -0,0 +1,87 @@
+"""Число запросов списка скидок не зависит от количества скидок
+
+Нужна БД с примененными миграциями (переменные окружения как для приложения).
+Все данные создаются в транзакции, которая откатывается в конце теста.
+"""
+import asyncio
+import random
+
+import pytest
+
+try:
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from src.database import engine
+    from src.discount.service import get_all_discounts
+    from src.models import (
+        Discount, CategoryToDiscount, ColorToDiscount, SeasonToDiscount, SizeToDiscount,
+        ProductCategory, ProductColor, ProductSize, Season
+    )
+except Exception as e:  # нет настроек БД или зависимостей
+    pytest.skip(f"приложение не настроено: {e}", allow_module_level=True)
+
+DISCOUNTS_STEP = 10
+
+
+async def _seed_discounts(session: AsyncSession, count: int) -> None:
+    """count скидок, у каждой по связи каждого вида"""
+    category = ProductCategory(name=f"test-category-{random.randint(0, 10 ** 9)}")
+    color = ProductColor(name=f"test-color-{random.randint(0, 10 ** 9)}")
+    size = ProductSize(value=random.randint(10 ** 8, 2 * 10 ** 9))
+    session.add_all([category, color, size])
+    await session.flush()
+
+    for i in range(count):
+        discount = Discount(name=f"test-discount-{i}", percentage=5.0)
+        session.add(discount)
+        await session.flush()
+        session.add_all([
+            CategoryToDiscount(categoryId=category.id, discountId=discount.id),
+            ColorToDiscount(colorId=color.id, discountId=discount.id),
+            SeasonToDiscount(season=Season.WINTER, discountId=discount.id),
+            SizeToDiscount(sizeId=size.id, discountId=discount.id)
+        ])
+    await session.flush()
+    # Без объектов в сессии связи придется загрузить из БД
+    session.expunge_all()
+
+
+async def _count_list_queries(session: AsyncSession) -> int:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await get_all_discounts(session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+async def _query_counts() -> list:
+    try:
+        conn = await engine.connect()
+    except Exception as e:
+        pytest.skip(f"БД недоступна: {e}")
+
+    transaction = await conn.begin()
+    session = AsyncSession(bind=conn, expire_on_commit=False)
+    try:
+        counts = []
+        for _ in range(2):
+            await _seed_discounts(session, DISCOUNTS_STEP)
+            counts.append(await _count_list_queries(session))
+        return counts
+    finally:
+        await session.close()
+        await transaction.rollback()
+        await conn.close()
+        await engine.dispose()
+
+
+def test_get_all_discounts_query_count_is_constant():
+    with_n, with_2n = asyncio.run(_query_counts())
+    assert with_n == with_2n, f"{DISCOUNTS_STEP} скидок: {with_n} запросов, {2 * DISCOUNTS_STEP}: {with_2n}"